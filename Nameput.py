@@ -11,6 +11,8 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QPixmap, QImage, QFont
 from PyQt6.QtCore import Qt, QSize
 
+from certengine.profiles import save_kwargs
+
 class PdfCertificateGenerator(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -262,7 +264,7 @@ class PdfCertificateGenerator(QMainWindow):
 
                 safe_name = re.sub(r'[\\/*?:"<>|]', "_", name)
                 output_path = os.path.join(self.output_folder, f"Certificate - {safe_name}.pdf")
-                doc.save(output_path, garbage=4, deflate=True)
+                doc.save(output_path, **save_kwargs("classic"))
                 doc.close()
                 count += 1
             
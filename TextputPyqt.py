@@ -9,6 +9,8 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QPixmap, QImage, QFont
 from PyQt6.QtCore import Qt, QSize
 
+from certengine.profiles import save_kwargs
+
 class PdfTextEditor(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -202,7 +204,7 @@ class PdfTextEditor(QMainWindow):
         )
         
         try:
-            final_doc.save(save_path, garbage=4, deflate=True)
+            final_doc.save(save_path, **save_kwargs("classic"))
             QMessageBox.information(self, "Success", f"PDF saved successfully to:\n{save_path}")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save PDF: {e}")
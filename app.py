@@ -7,6 +7,8 @@ from PIL import Image
 import os
 import re
 
+from certengine.profiles import save_kwargs
+
 class CertificateGenerator(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -242,7 +244,7 @@ class CertificateGenerator(ctk.CTk):
 
                 page.insert_text((x, y), str(name), fontsize=size, fontname="helv-bold", color=self.font_color, align=fitz.TEXT_ALIGN_CENTER)
 
-                doc.save(output_filename, garbage=4, deflate=True)
+                doc.save(output_filename, **save_kwargs("classic"))
                 doc.close()
 
                 # Update GUI
@@ -0,0 +1,55 @@
+"""
+Qt-free certificate generation engine.
+
+Shared by the PyQt6 GUI (main.py) and the headless batch entry point:
+
+    python -m certengine TEMPLATE.pdf DATA.csv LAYOUT.json OUTPUT_FOLDER
+"""
+from .engine import (
+    Layout,
+    load_fonts,
+    parse_csv,
+    certificate_filename,
+    insert_text_with_autoresize,
+    break_lines,
+    draw_text_lines,
+    text_max_width,
+    underline_segment,
+    add_underline_to_text,
+    CertificateFonts,
+    fit_fontsize,
+    fit_fontsizes,
+    plan_certificate,
+    plan_certificates,
+    plan_batch,
+    draw_certificate,
+    draw_certificate_overlay,
+    write_certificate_overlay,
+    render_certificate_text,
+    Template,
+    GenerationSummary,
+    GenerationCancelled,
+    BatchControl,
+    render_certificate,
+    certificate_bytes,
+    resolve_workers,
+    generate_certificates,
+    generate_combined,
+    generate_archive,
+)
+from .profiles import (
+    SaveProfile,
+    SAVE_PROFILES,
+    DEFAULT_SAVE_PROFILE,
+    get_save_profile,
+    save_kwargs,
+)
+from .fonts import RegisteredFont, font_key, font_from_buffer, font_from_file, builtin_font, registered_font
+from .measure import TextMeasureCache, MeasureStats, MEASURE_CACHE, text_width
+from .advances import GlyphAdvanceTable, advance_table, column_unit_widths
+from .plan import CertificatePlan, BatchPlan
+from .overlay import RENDER_BACKENDS, DEFAULT_RENDER_BACKEND, get_render_backend, GlyphEncoder, OverlayWriter
+from .preview import PreviewRenderer
+from .dryrun import DryRunReport, dry_run
+from .archive import ArchiveWriter, ARCHIVE_FORMATS, archive_format_for
+from .manifest import Manifest, manifest_path_for
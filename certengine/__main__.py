@@ -0,0 +1,157 @@
+import sys
+import os
+import argparse
+import contextlib
+
+import pymupdf
+
+from .engine import Layout, load_fonts, parse_csv, generate_certificates, generate_combined, generate_archive
+from .profiles import SAVE_PROFILES, DEFAULT_SAVE_PROFILE
+from .overlay import RENDER_BACKENDS, DEFAULT_RENDER_BACKEND
+from .archive import ARCHIVE_FORMATS, archive_format_for
+from .plan import parquet_engine, is_parquet_path
+from .dryrun import dry_run
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m certengine",
+        description="Generate certificates from a template PDF and a data CSV without starting the GUI.")
+    parser.add_argument("template", help="Template PDF (the first page is used)")
+    parser.add_argument("csv", help="Data CSV with name and achievement columns")
+    parser.add_argument("layout", help="Layout JSON, as saved from the GUI with 'Save Layout...'")
+    parser.add_argument("output", nargs="?", help="Output folder for the generated certificates "
+                                                  "(the output PDF file with --combined, the archive file "
+                                                  "or '-' for stdout with --archive; not used with --dry-run)")
+    parser.add_argument("--skip-rows", type=int, default=3,
+                        help="Number of leading CSV rows to ignore (default: 3)")
+    parser.add_argument("--font", default=None,
+                        help="Achievement font file (default: Brixton_Medium.ttf)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="Worker processes; 0 uses one per CPU core (default: 1)")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Rows handed to a worker at a time (default: automatic)")
+    parser.add_argument("--profile", choices=sorted(SAVE_PROFILES), default=DEFAULT_SAVE_PROFILE,
+                        help=f"Save profile trading speed for size (default: {DEFAULT_SAVE_PROFILE})")
+    parser.add_argument("--backend", choices=list(RENDER_BACKENDS), default=DEFAULT_RENDER_BACKEND,
+                        help="How the text is drawn: 'direct' writes each certificate's text as one "
+                             f"precomputed content stream, with the same result (default: {DEFAULT_RENDER_BACKEND})")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="Render every row even if the manifest next to the output folder "
+                             "records it as finished")
+    parser.add_argument("--combined", action="store_true",
+                        help="Write all certificates as pages of one PDF that shares the template")
+    parser.add_argument("--flush-every", type=int, default=500,
+                        help="With --combined, pages written per incremental save (default: 500)")
+    parser.add_argument("--archive", choices=ARCHIVE_FORMATS, default=None,
+                        help="Stream the certificates into a ZIP or TAR archive instead of loose files "
+                             "(implied by an OUTPUT ending in .zip, .tar, .tar.gz or .tgz)")
+    parser.add_argument("--measure-cache", default=None, metavar="PATH",
+                        help="JSON file of measured text widths reused across runs (created if missing)")
+    parser.add_argument("--export-plan", default=None, metavar="PATH",
+                        help="Write the layout plan (sizes, line breaks, underlines per row) "
+                             "to PATH as JSON, or as Parquet if PATH ends in .parquet")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only lay out the rows and report sizes, line counts and rows that shrink "
+                             "to the minimum size or overflow the achievement box; writes no PDFs")
+    parser.add_argument("--report", default=None, metavar="PATH",
+                        help="With --dry-run, write the per-row report to PATH as CSV")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.export_plan and is_parquet_path(args.export_plan) and parquet_engine() is None:
+        parser.error("--export-plan to a .parquet file needs pyarrow (install the 'parquet' extra) "
+                     "or fastparquet; or export the plan as .json")
+
+    if args.dry_run:
+        return _dry_run(args)
+    if args.output is None:
+        parser.error("the output argument is required unless --dry-run is given")
+
+    archive_format = args.archive
+    if archive_format is None and not args.combined:
+        archive_format = archive_format_for(args.output)
+    if args.output == "-" and archive_format is None:
+        parser.error("writing to stdout ('-') needs --archive")
+    if archive_format and args.combined:
+        parser.error("--archive and --combined cannot be used together")
+
+    if args.output != "-":
+        return _run(args, archive_format, args.output)
+
+    # The archive itself goes to stdout, so every message has to go to stderr.
+    target = sys.stdout.buffer
+    pymupdf.set_messages(fd=2)
+    with contextlib.redirect_stdout(sys.stderr):
+        return _run(args, archive_format, target)
+
+
+def _run(args, archive_format, target):
+    layout = Layout.load(args.layout)
+    certificate_data = parse_csv(args.csv, skip_rows=args.skip_rows)
+    if not certificate_data:
+        print("No valid data found in CSV.", file=sys.stderr)
+        return 1
+
+    if args.output == "-":
+        output_dir = None
+    elif args.combined or archive_format:
+        output_dir = os.path.dirname(os.path.abspath(args.output))
+    else:
+        output_dir = args.output
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    fonts = load_fonts(args.font)
+
+    if args.combined:
+        summary = generate_combined(args.template, certificate_data, layout, args.output, fonts=fonts,
+                                    chunk_size=args.flush_every, save_profile=args.profile,
+                                    measure_cache=args.measure_cache, plan_path=args.export_plan,
+                                    backend=args.backend)
+    elif archive_format:
+        summary = generate_archive(args.template, certificate_data, layout, target, archive_format,
+                                   fonts=fonts, workers=args.workers, chunk_size=args.chunk_size,
+                                   save_profile=args.profile, measure_cache=args.measure_cache,
+                                   plan_path=args.export_plan, backend=args.backend)
+    else:
+        summary = generate_certificates(args.template, certificate_data, layout, args.output, fonts=fonts,
+                                        workers=args.workers, chunk_size=args.chunk_size,
+                                        save_profile=args.profile, resume=args.resume,
+                                        measure_cache=args.measure_cache, plan_path=args.export_plan,
+                                        backend=args.backend)
+
+    destination = "stdout" if args.output == "-" else args.output
+    print(f"Successfully generated and saved certificates to: {destination}")
+    print(summary)
+    return 0
+
+
+def _dry_run(args, max_listed=20):
+    layout = Layout.load(args.layout)
+    certificate_data = parse_csv(args.csv, skip_rows=args.skip_rows)
+    if not certificate_data:
+        print("No valid data found in CSV.", file=sys.stderr)
+        return 1
+
+    report = dry_run(args.template, certificate_data, layout, fonts=load_fonts(args.font))
+    flagged = report.flagged()
+    for row in flagged[:max_listed]:
+        problems = [text for text, flag in (("name shrunk to minimum size", row.name_clamped),
+                                            ("achievement shrunk to minimum size", row.ach_clamped),
+                                            ("achievement overflows its box", row.ach_overflow)) if flag]
+        print(f"row {row.row} ({row.name}): {', '.join(problems)}; "
+              f"achievement {row.ach_size}pt on {row.ach_lines} line(s)")
+    if len(flagged) > max_listed:
+        print(f"... and {len(flagged) - max_listed} more")
+    if args.report:
+        report.save_csv(args.report)
+        print(f"Report written to: {args.report}")
+    print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
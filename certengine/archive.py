@@ -0,0 +1,113 @@
+"""
+Streaming ZIP / TAR output.
+
+Rendered certificates are handed to ArchiveWriter as bytes; a background thread
+compresses and writes them, so rendering never waits on the archive.
+"""
+import io
+import time
+import queue
+import tarfile
+import zipfile
+import threading
+
+ARCHIVE_FORMATS = ("zip", "tar", "tar.gz")
+
+_DONE = object()
+
+
+def archive_format_for(path):
+    """Guesses the archive format from the output file name; None if it is not an archive."""
+    lowered = path.lower()
+    if lowered.endswith(".zip"):
+        return "zip"
+    if lowered.endswith((".tar.gz", ".tgz")):
+        return "tar.gz"
+    if lowered.endswith(".tar"):
+        return "tar"
+    return None
+
+
+class ArchiveWriter:
+    """
+    Writes (name, bytes) members into a ZIP or TAR archive on a background thread.
+    target is a file path or a writable binary file object (e.g. sys.stdout.buffer).
+    add() blocks only when max_pending members are already waiting to be written.
+    """
+    def __init__(self, target, archive_format="zip", compresslevel=6, max_pending=64):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format '{archive_format}'. Choose from: {', '.join(ARCHIVE_FORMATS)}")
+        self.archive_format = archive_format
+        self.compresslevel = compresslevel
+        self.members = 0
+        self.bytes_in = 0
+        self._error = None
+        self._queue = queue.Queue(maxsize=max_pending)
+
+        if isinstance(target, (str, bytes)) or hasattr(target, "__fspath__"):
+            self._fileobj = open(target, "wb")
+            self._owns_file = True
+        else:
+            self._fileobj = target
+            self._owns_file = False
+
+        self._thread = threading.Thread(target=self._run, name="certengine-archive-writer", daemon=True)
+        self._thread.start()
+
+    def _open_archive(self):
+        if self.archive_format == "zip":
+            return zipfile.ZipFile(self._fileobj, mode="w", compression=zipfile.ZIP_DEFLATED,
+                                   compresslevel=self.compresslevel)
+        # Stream modes ("w|") never seek, so they also work on pipes and stdout.
+        if self.archive_format == "tar.gz":
+            return tarfile.open(fileobj=self._fileobj, mode="w|gz", compresslevel=self.compresslevel)
+        return tarfile.open(fileobj=self._fileobj, mode="w|")
+
+    def _write_member(self, archive, name, data):
+        if self.archive_format == "zip":
+            archive.writestr(name, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            archive.addfile(info, io.BytesIO(data))
+
+    def _run(self):
+        finished = False
+        try:
+            with self._open_archive() as archive:
+                while True:
+                    item = self._queue.get()
+                    if item is _DONE:
+                        finished = True
+                        break
+                    self._write_member(archive, *item)
+        except BaseException as e:
+            self._error = e
+            # Keep draining so producers blocked in add() are released.
+            while not finished:
+                finished = self._queue.get() is _DONE
+
+    def add(self, name, data):
+        if self._error is not None:
+            raise self._error
+        self.members += 1
+        self.bytes_in += len(data)
+        self._queue.put((name, data))
+
+    def close(self):
+        """Waits for pending members, finishes the archive and re-raises any writer error."""
+        self._queue.put(_DONE)
+        self._thread.join()
+        if self._owns_file:
+            self._fileobj.close()
+        else:
+            self._fileobj.flush()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,130 @@
+"""
+Micro-benchmarks for the batch engine.
+
+    python -m certengine.bench TEMPLATE.pdf DATA.csv LAYOUT.json [--rows N]
+
+Compares opening the template from disk for every row (the old generation loop)
+with cloning the Template parsed once per batch, row-by-row layout with the
+vectorized layout of whole columns, and the render backends on the same plans. The
+pages both backends draw are rasterized and compared pixel by pixel; any difference
+makes the run exit with status 1.
+"""
+import sys
+import time
+import argparse
+
+import pymupdf as fitz  # PyMuPDF
+
+from .engine import (Layout, Template, CertificateFonts, load_fonts, parse_csv, render_certificate_text,
+                     render_certificate, plan_certificate, plan_certificates)
+from .measure import MEASURE_CACHE
+from .overlay import RENDER_BACKENDS
+
+
+def _time_rows(rows, make_doc, render, layout, fonts, page_size):
+    start = time.perf_counter()
+    for name, achievement in rows:
+        doc = make_doc()
+        if render:
+            render_certificate_text(doc[0], name, achievement, layout, fonts, *page_size)
+        # MuPDF opens lazily, so the template's objects are only read when the copy is serialized.
+        doc.tobytes(garbage=4, deflate=True)
+        doc.close()
+    return (time.perf_counter() - start) / len(rows) * 1000
+
+
+def _time_backend(template, rows, plans, layout, fonts, backend):
+    start = time.perf_counter()
+    for (name, achievement), plan in zip(rows, plans):
+        doc = render_certificate(template, name, achievement, layout, fonts, plan, backend)
+        doc.tobytes(garbage=1, deflate=True)
+        doc.close()
+    return (time.perf_counter() - start) / len(rows) * 1000
+
+
+def _page_pixels(doc, dpi):
+    pdf = fitz.open("pdf", doc.tobytes())
+    samples = pdf[0].get_pixmap(dpi=dpi).samples
+    pdf.close()
+    doc.close()
+    return samples
+
+
+def _pixel_mismatches(template, rows, plans, layout, fonts, dpi):
+    """Rows whose page differs between the backends when rasterized at dpi."""
+    mismatches = []
+    for (name, achievement), plan in zip(rows, plans):
+        pages = {_page_pixels(render_certificate(template, name, achievement, layout, fonts, plan, backend), dpi)
+                 for backend in RENDER_BACKENDS}
+        if len(pages) > 1:
+            mismatches.append(name)
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m certengine.bench", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("template")
+    parser.add_argument("csv")
+    parser.add_argument("layout")
+    parser.add_argument("--rows", type=int, default=200, help="Rows to time per variant (default: 200)")
+    parser.add_argument("--skip-rows", type=int, default=3)
+    parser.add_argument("--check-rows", type=int, default=50,
+                        help="Rows rendered with every backend and compared pixel by pixel (default: 50)")
+    parser.add_argument("--check-dpi", type=int, default=150)
+    args = parser.parse_args(argv)
+
+    layout = Layout.load(args.layout)
+    fonts = CertificateFonts(*load_fonts())
+    certificate_data = parse_csv(args.csv, skip_rows=args.skip_rows)
+    if not certificate_data:
+        print("No valid data found in CSV.", file=sys.stderr)
+        return 1
+    rows = [certificate_data[i % len(certificate_data)] for i in range(args.rows)]
+
+    start = time.perf_counter()
+    template = Template.open(args.template)
+    parse_ms = (time.perf_counter() - start) * 1000
+    page_size = (template.page_width, template.page_height)
+
+    variants = [
+        ("open from disk per row", lambda: fitz.open(args.template)),
+        ("clone cached template", template.new_document),
+    ]
+
+    print(f"Template parsed once in {parse_ms:.2f} ms; {len(rows)} rows per variant")
+    print(f"{'variant':<26}{'template-only ms/row':>22}{'full row ms/row':>18}")
+    for label, make_doc in variants:
+        open_ms = _time_rows(rows, make_doc, False, layout, fonts, page_size)
+        full_ms = _time_rows(rows, make_doc, True, layout, fonts, page_size)
+        print(f"{label:<26}{open_ms:>22.3f}{full_ms:>18.3f}")
+
+    # Layout only, with a cold text-width cache each time.
+    MEASURE_CACHE.clear()
+    start = time.perf_counter()
+    for name, achievement in rows:
+        plan_certificate(name, achievement, layout, fonts, *page_size)
+    row_ms = (time.perf_counter() - start) / len(rows) * 1000
+    MEASURE_CACHE.clear()
+    start = time.perf_counter()
+    plan_certificates(rows, layout, fonts, *page_size)
+    column_ms = (time.perf_counter() - start) / len(rows) * 1000
+    print(f"layout: {row_ms:.4f} ms/row row by row, {column_ms:.4f} ms/row vectorized")
+
+    plans = plan_certificates(rows, layout, fonts, *page_size)
+    timings = ", ".join(f"{_time_backend(template, rows, plans, layout, fonts, backend):.3f} ms/row {backend}"
+                        for backend in RENDER_BACKENDS)
+    print(f"render backends: {timings}")
+
+    check_rows = rows[:args.check_rows]
+    mismatches = _pixel_mismatches(template, check_rows, plans, layout, fonts, args.check_dpi)
+    template.close()
+    if mismatches:
+        print(f"pixel check: {len(mismatches)} of {len(check_rows)} rows differ between backends, "
+              f"first: {mismatches[0]!r}")
+        return 1
+    print(f"pixel check: {len(check_rows)} rows identical at {args.check_dpi} dpi across backends")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Layout-only dry runs.
+
+Runs the layout phase for a whole CSV without producing any PDF and reports, per row,
+the fitted sizes and line count and whether the achievement was shrunk all the way to
+MIN_FONTSIZE or runs outside its box, so problem rows can be fixed before a long render.
+"""
+import csv
+import time
+
+import pymupdf as fitz  # PyMuPDF
+
+from .engine import MIN_FONTSIZE, Template, CertificateFonts, load_fonts, plan_batch, text_overflows
+
+REPORT_FIELDS = ("row", "file", "name", "achievement", "name_size", "name_clamped",
+                 "ach_size", "ach_lines", "ach_clamped", "ach_overflow")
+
+
+class DryRunRow:
+    __slots__ = REPORT_FIELDS
+
+    def __init__(self, **values):
+        for field in REPORT_FIELDS:
+            setattr(self, field, values[field])
+
+    @property
+    def flagged(self):
+        return self.name_clamped or self.ach_clamped or self.ach_overflow
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in REPORT_FIELDS}
+
+
+class DryRunReport:
+    def __init__(self, rows, elapsed):
+        self.rows = rows
+        self.elapsed = elapsed
+
+    def flagged(self):
+        return [row for row in self.rows if row.flagged]
+
+    @property
+    def rows_per_second(self):
+        return len(self.rows) / self.elapsed if self.elapsed else 0.0
+
+    def save_csv(self, path):
+        with open(path, mode='w', encoding='utf-8', newline='') as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            for row in self.rows:
+                writer.writerow(row.to_dict())
+
+    def __str__(self):
+        clamped = sum(1 for row in self.rows if row.name_clamped or row.ach_clamped)
+        overflowing = sum(1 for row in self.rows if row.ach_overflow)
+        return (f"{len(self.rows)} rows laid out in {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/s): "
+                f"{clamped} shrunk to {MIN_FONTSIZE}pt, {overflowing} overflow the achievement box")
+
+
+def dry_run(template_path, certificate_data, layout, fonts=None):
+    """Lays out every row of certificate_data without rendering; returns a DryRunReport."""
+    start_time = time.perf_counter()
+    if fonts is None:
+        fonts = load_fonts()
+    fonts = CertificateFonts.coerce(fonts)
+    template = Template.open(template_path)
+    try:
+        batch_plan = plan_batch(certificate_data, layout, fonts, template.page_width, template.page_height)
+    finally:
+        template.close()
+
+    ach_rect = layout.ach_rect()
+    # Rows with the same fitted lines overflow alike; check each combination once.
+    overflows = {}
+    rows = []
+    for index, (filename, name, achievement, plan) in enumerate(batch_plan.entries):
+        key = (plan.ach_size, plan.ach_lines)
+        if key not in overflows:
+            overflows[key] = text_overflows(fitz.Rect(plan.ach_box), plan.ach_lines, fonts.achievement_font,
+                                            plan.ach_size, layout.ach_rot, ach_rect)
+        rows.append(DryRunRow(
+            row=index + 1, file=filename, name=name, achievement=achievement,
+            name_size=plan.name_size,
+            name_clamped=layout.autoresize and plan.name_size <= MIN_FONTSIZE < layout.name_size,
+            ach_size=plan.ach_size, ach_lines=len(plan.ach_lines),
+            ach_clamped=layout.autoresize and plan.ach_size <= MIN_FONTSIZE < layout.ach_size,
+            ach_overflow=overflows[key],
+        ))
+    return DryRunReport(rows, time.perf_counter() - start_time)
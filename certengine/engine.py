@@ -0,0 +1,1096 @@
+import os
+import csv
+import math
+import re
+import json
+import time
+import threading
+import collections
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pymupdf as fitz  # PyMuPDF ("import fitz" prints a deprecation notice on stdout)
+
+from .profiles import get_save_profile
+from .fonts import builtin_font, font_from_file, font_from_buffer, registered_font
+from .archive import ArchiveWriter
+from .measure import MEASURE_CACHE, text_width
+from .advances import column_unit_widths
+from .pipeline import run_pipeline
+from .plan import CertificatePlan, BatchPlan
+from .overlay import OverlayWriter, get_render_backend, glyph_encoder
+from .manifest import Manifest, batch_fingerprint, row_hash, manifest_path_for
+
+# The bundled fonts live next to the GUI scripts, one level above this package.
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ACHIEVEMENT_FONT_FILENAME = "Brixton_Medium.ttf"
+
+TEXT_COLOR = (1, 1, 1)
+# Autoresize never shrinks text below this size; longer text is wrapped instead.
+MIN_FONTSIZE = 8
+
+
+class Layout:
+    """
+    Text placement for a batch, i.e. the values of the sliders in main.py.
+    Saved to / loaded from a small JSON file so batches can run without the GUI.
+    """
+    FIELDS = (
+        "name_x", "name_y", "name_size", "name_rot",
+        "ach_x", "ach_y", "ach_w", "ach_h", "ach_size", "ach_rot",
+        "underline_spacing", "autoresize",
+    )
+
+    def __init__(self, name_x=0, name_y=0, name_size=36, name_rot=0,
+                 ach_x=0, ach_y=0, ach_w=50, ach_h=50, ach_size=36, ach_rot=0,
+                 underline_spacing=0, autoresize=True):
+        self.name_x = name_x
+        self.name_y = name_y
+        self.name_size = name_size
+        self.name_rot = name_rot
+        self.ach_x = ach_x
+        self.ach_y = ach_y
+        self.ach_w = ach_w
+        self.ach_h = ach_h
+        self.ach_size = ach_size
+        self.ach_rot = ach_rot
+        self.underline_spacing = underline_spacing
+        self.autoresize = autoresize
+
+    @classmethod
+    def from_dict(cls, data):
+        unknown = set(data) - set(cls.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown layout keys: {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, mode='r', encoding='utf-8') as infile:
+            return cls.from_dict(json.load(infile))
+
+    def save(self, path):
+        with open(path, mode='w', encoding='utf-8') as outfile:
+            json.dump(self.to_dict(), outfile, indent=2)
+
+    def name_rect(self, page_width, page_height):
+        return fitz.Rect(self.name_x, self.name_y, page_width, page_height)
+
+    def ach_rect(self):
+        return fitz.Rect(self.ach_x, self.ach_y, self.ach_x + self.ach_w, self.ach_y + self.ach_h)
+
+
+def load_fonts(achievement_font_path=None):
+    """Returns (name_font, achievement_font), falling back to Helvetica for the achievement font."""
+    font_name_bold = builtin_font("Helvetica-Bold").font
+
+    if achievement_font_path is None:
+        achievement_font_path = os.path.join(ROOT_DIR, ACHIEVEMENT_FONT_FILENAME)
+    try:
+        font_achievement_reg = font_from_file(achievement_font_path).font
+        print(f"Successfully loaded custom font: {os.path.basename(achievement_font_path)}")
+    except Exception as e:
+        print(f"WARNING: Could not load custom font '{os.path.basename(achievement_font_path)}'. Falling back to Helvetica.")
+        print(f"Error details: {e}")
+        font_achievement_reg = builtin_font("Helvetica").font
+
+    return font_name_bold, font_achievement_reg
+
+
+def parse_csv(csv_path, skip_rows=3):
+    """
+    Reads [name, achievement] pairs from the award CSV.
+    A row with an empty name continues the previous person's achievement on a new line.
+    """
+    certificate_data = []
+    with open(csv_path, mode='r', encoding='utf-8-sig') as infile:
+        reader = csv.reader(infile)
+        for _ in range(skip_rows):
+            try:
+                next(reader)
+            except StopIteration:
+                break
+
+        for row in reader:
+            if not row or (len(row) < 2) or (not row[0].strip() and not row[1].strip()):
+                continue
+
+            name = row[0].strip()
+            achievement = row[1].strip()
+
+            if name:
+                certificate_data.append([name, achievement])
+            elif achievement and certificate_data:
+                certificate_data[-1][1] += f"\n{achievement}"
+
+    return certificate_data
+
+
+def certificate_filename(name):
+    safe_name = re.sub(r'[\\/*?:"<>|]', "_", name)
+    return f"Certificate - {safe_name}.pdf"
+
+
+def _text_fits(font, rect, lines, fontsize, line_height_factor):
+    max_width = max(text_width(font, line, fontsize) for line in lines)
+    if len(lines) == 1:
+        return max_width <= rect.width
+    return max_width <= rect.width and len(lines) * line_height_factor * fontsize <= rect.height
+
+
+def fit_fontsize(font, rect, text, initial_fontsize, min_fontsize=MIN_FONTSIZE, autoresize=True, step=1):
+    """
+    Returns the largest size, counting down from initial_fontsize in steps of step
+    (0 for any fractional size), at which text fits rect; never less than min_fontsize.
+
+    Text width grows linearly with the size, so every line is measured once at 1pt and
+    the largest fitting size is solved for directly. Multi-line text must also fit the
+    height of rect. The result is checked with a real measurement, and a binary search
+    over smaller sizes covers the rare case where rounding makes it miss.
+    """
+    if not autoresize:
+        return initial_fontsize
+
+    lines = text.split('\n')
+    line_height_factor = font.ascender - font.descender
+    limit = initial_fontsize
+    unit_width = max(text_width(font, line, 1) for line in lines)
+    if unit_width > 0:
+        limit = min(limit, rect.width / unit_width)
+    if len(lines) > 1 and line_height_factor > 0:
+        limit = min(limit, rect.height / (len(lines) * line_height_factor))
+
+    if limit >= initial_fontsize:
+        return initial_fontsize
+    if limit < min_fontsize:
+        return min_fontsize
+
+    # Sizes on the grid initial_fontsize - k * step; step 0 allows any size, and falls
+    # back to a 0.01pt grid only if the solved size needs correcting.
+    grid = step or 0.01
+    if step:
+        k = math.ceil((initial_fontsize - limit) / step - 1e-9)
+    else:
+        k = (initial_fontsize - limit) / grid
+    size = initial_fontsize - k * grid
+    if size >= min_fontsize and _text_fits(font, rect, lines, size, line_height_factor):
+        return size
+
+    # Binary search for the smallest k (largest size) that fits.
+    lo, hi = math.floor(k) + 1, math.floor((initial_fontsize - min_fontsize) / grid + 1e-9)
+    found = None
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if _text_fits(font, rect, lines, initial_fontsize - mid * grid, line_height_factor):
+            found = mid
+            hi = mid - 1
+        else:
+            lo = mid + 1
+    if found is None:
+        return min_fontsize
+    return initial_fontsize - found * grid
+
+
+def fit_fontsizes(font, rect, texts, initial_fontsize, min_fontsize=MIN_FONTSIZE, autoresize=True, step=1):
+    """
+    fit_fontsize for a whole column of texts sharing one rect, as a list of sizes.
+    The 1pt widths of every line come from one vectorized pass over the column and the
+    solve and check run as array operations; only rows whose check fails go through
+    fit_fontsize one by one.
+    """
+    return _fit_column(font, rect, texts, initial_fontsize, min_fontsize, autoresize, step)[0]
+
+
+def _fit_column(font, rect, texts, initial_fontsize, min_fontsize=MIN_FONTSIZE, autoresize=True, step=1):
+    """fit_fontsizes, also returning each text's widest line at 1pt."""
+    if not texts:
+        return [], np.zeros(0)
+
+    split = [text.split('\n') for text in texts]
+    line_counts = np.array(list(map(len, split)), dtype=np.int64)
+    unit_widths = column_unit_widths(font, [line for lines in split for line in lines])
+    offsets = np.concatenate(([0], np.cumsum(line_counts)[:-1]))
+    max_unit_width = np.maximum.reduceat(unit_widths, offsets)
+    if not autoresize:
+        return [initial_fontsize] * len(texts), max_unit_width
+
+    line_height_factor = font.ascender - font.descender
+    limit = np.full(len(texts), float(initial_fontsize))
+    measured = max_unit_width > 0
+    limit[measured] = np.minimum(limit[measured], rect.width / max_unit_width[measured])
+    multi_line = line_counts > 1
+    if line_height_factor > 0:
+        limit[multi_line] = np.minimum(limit[multi_line],
+                                       rect.height / (line_counts[multi_line] * line_height_factor))
+
+    # The same grid arithmetic as fit_fontsize, elementwise.
+    grid = step or 0.01
+    if step:
+        k = np.ceil((initial_fontsize - limit) / step - 1e-9)
+    else:
+        k = (initial_fontsize - limit) / grid
+    sizes = initial_fontsize - k * grid
+    fits = (sizes >= min_fontsize) & (max_unit_width * sizes <= rect.width)
+    fits &= ~multi_line | (line_counts * line_height_factor * sizes <= rect.height)
+
+    sizes = np.where(limit >= initial_fontsize, initial_fontsize, np.where(limit < min_fontsize, min_fontsize, sizes))
+    if step and all(isinstance(value, int) for value in (initial_fontsize, min_fontsize, step)):
+        result = sizes.astype(np.int64).tolist()
+    else:
+        result = sizes.tolist()
+    for i in np.flatnonzero(~fits & (limit < initial_fontsize) & (limit >= min_fontsize)).tolist():
+        result[i] = fit_fontsize(font, rect, texts[i], initial_fontsize, min_fontsize, autoresize, step)
+    return result, max_unit_width
+
+
+def shrink_offset_rect(rect, initial_fontsize, final_size):
+    # Calculate vertical offset based on how much the text was shrunk
+    # The more the text shrinks, the more we move it down
+    size_reduction_ratio = (initial_fontsize - final_size) / initial_fontsize
+    vertical_offset = size_reduction_ratio * (rect.height * 0.23)  # Adjust 0.2 factor as needed
+
+    # Create adjusted rectangle with vertical offset
+    return fitz.Rect(
+        rect.x0,
+        rect.y0 + vertical_offset,
+        rect.x1,
+        rect.y1 + vertical_offset
+    )
+
+
+def break_lines(font, text, fontsize, max_width):
+    """
+    Splits text into the lines to draw at fontsize: the explicit line breaks, with any
+    line wider than max_width word-wrapped greedily and words longer than a line split
+    by character. Lines that fit are kept whole, so text fitted by fit_fontsize is only
+    ever split at its own line breaks. Widths come from the text-width cache.
+    """
+    space_width = text_width(font, " ", fontsize)
+    lines = []
+    for paragraph in text.splitlines():
+        if text_width(font, paragraph, fontsize) <= max_width:
+            lines.append(paragraph)
+            continue
+        line = ""
+        line_width = 0.0
+        for word in paragraph.split(" "):
+            word_width = text_width(font, word, fontsize)
+            if line and line_width + space_width + word_width <= max_width:
+                line += " " + word
+                line_width += space_width + word_width
+                continue
+            if line:
+                lines.append(line)
+            if word_width <= max_width:
+                line, line_width = word, word_width
+                continue
+            line = ""
+            for char in word:
+                if line and text_width(font, line + char, fontsize) > max_width:
+                    lines.append(line)
+                    line = ""
+                line += char
+            line_width = text_width(font, line, fontsize)
+        lines.append(line)
+    return lines
+
+
+def _frame_to_page(x0, y0, x1, y1, x, y, rotate):
+    """
+    Maps (x, y) in the text frame of the box (x0, y0, x1, y1) onto the page as an
+    (x, y) pair; works on floats and on NumPy arrays alike. rotate is 0, 90, 180 or 270.
+    """
+    if rotate == 90:
+        return x0 + y, y1 - x
+    if rotate == 180:
+        return x1 - x, y1 - y
+    if rotate == 270:
+        return x1 - y, y0 + x
+    return x0 + x, y0 + y
+
+
+def _text_frame(rect, font, fontsize, rotate):
+    """
+    Returns (line length available, line advance, first baseline, to_page) for text
+    centred in rect the way page.insert_textbox lays it out. to_page maps a point in the
+    text's own frame (x along the line from the edge the text starts at, y across the
+    lines from the edge the first line sits against) onto the page.
+    """
+    rotate %= 360
+    ascender, descender = font.ascender, font.descender
+    line_height_factor = ascender - descender if ascender - descender > 1 else 1.2
+    max_width = rect.width if rotate in (0, 180) else rect.height
+
+    def to_page(x, y):
+        return fitz.Point(_frame_to_page(rect.x0, rect.y0, rect.x1, rect.y1, x, y, rotate))
+
+    # insert_textbox advances each line by line_height_factor * ascender * fontsize.
+    return max_width, line_height_factor * ascender * fontsize, ascender * fontsize, to_page
+
+
+def draw_text_lines(page, rect, lines, font, font_alias, fontsize, rotate):
+    """Draws already broken lines centred in rect, one insert_text per line."""
+    max_width, advance, first_baseline, to_page = _text_frame(rect, font, fontsize, rotate)
+    for i, line in enumerate(lines):
+        if not line:
+            continue
+        x = (max_width - text_width(font, line, fontsize)) / 2
+        page.insert_text(to_page(x, first_baseline + i * advance), line,
+                         fontname=font_alias, fontsize=fontsize, color=TEXT_COLOR, rotate=rotate % 360)
+
+
+def underline_segment(rect, lines, font, fontsize, rotate, spacing):
+    """
+    Returns the (start, end) points of an underline below the last non-empty line as
+    draw_text_lines places it in rect, or None if every line is empty. The baseline
+    and extent follow from the font's ascender and descender, the line index and the centring.
+    """
+    last = next((i for i in range(len(lines) - 1, -1, -1) if lines[i].strip()), None)
+    if last is None:
+        return None
+
+    max_width, advance, first_baseline, to_page = _text_frame(rect, font, fontsize, rotate)
+    line_width = text_width(font, lines[last], fontsize)
+    y = first_baseline + last * advance - font.descender * fontsize + spacing
+    x0 = (max_width - line_width) / 2
+    return to_page(x0, y), to_page(x0 + line_width, y)
+
+
+def text_overflows(box, lines, font, fontsize, rotate, bounds):
+    """True if lines, as draw_text_lines places them in box, reach outside the rect bounds."""
+    if not any(lines):
+        return False
+    max_width, advance, first_baseline, to_page = _text_frame(box, font, fontsize, rotate)
+    widest = max(text_width(font, line, fontsize) for line in lines)
+    x0 = (max_width - widest) / 2
+    bottom = first_baseline + (len(lines) - 1) * advance - font.descender * fontsize
+    extent = fitz.Rect(to_page(x0, 0), to_page(x0 + widest, bottom)).normalize()
+    tolerance = 1e-3
+    return (extent.x0 < bounds.x0 - tolerance or extent.y0 < bounds.y0 - tolerance
+            or extent.x1 > bounds.x1 + tolerance or extent.y1 > bounds.y1 + tolerance)
+
+
+def add_underline_to_text(page, rect, lines, font, fontsize, rotate, spacing):
+    """Underlines the last of the lines draw_text_lines drew into rect."""
+    segment = underline_segment(rect, lines, font, fontsize, rotate, spacing)
+    if segment is None:
+        return
+    page.draw_line(*segment, color=TEXT_COLOR, width=max(0.7, fontsize * 0.05))
+
+
+def text_max_width(rect, rotate):
+    """Length available to one line of text in rect at the given rotation."""
+    return rect.width if rotate % 360 in (0, 180) else rect.height
+
+
+def draw_fitted_text(page, adjusted_rect, lines, font, font_alias, fontsize, rotate,
+                     underline=False, underline_spacing=3):
+    """Writes broken lines centred in adjusted_rect at an already fitted size, optionally underlined."""
+    draw_text_lines(page, adjusted_rect, lines, font, font_alias, fontsize, rotate)
+    if underline:
+        add_underline_to_text(page, adjusted_rect, lines, font, fontsize, rotate, underline_spacing)
+
+
+def insert_text_with_autoresize(page, rect, text, font_buffer, font_alias, initial_fontsize, rotate,
+                                underline=False, underline_spacing=3, min_fontsize=MIN_FONTSIZE, autoresize=True):
+    temp_font = font_from_buffer(font_buffer).font
+    final_size = fit_fontsize(temp_font, rect, text, initial_fontsize, min_fontsize, autoresize)
+    lines = break_lines(temp_font, text, final_size, text_max_width(rect, rotate))
+    adjusted_rect = shrink_offset_rect(rect, initial_fontsize, final_size)
+    draw_fitted_text(page, adjusted_rect, lines, temp_font, font_alias, final_size, rotate,
+                     underline=underline, underline_spacing=underline_spacing)
+
+
+class CertificateFonts:
+    """
+    The name and achievement fonts with their file bytes and registry keys, all taken
+    from the font registry: Font.buffer copies the whole font file on every access, so
+    it must not be read per row.
+    """
+    NAME_ALIAS = "F0"
+    ACHIEVEMENT_ALIAS = "F1"
+
+    def __init__(self, name_font, achievement_font):
+        name_entry = registered_font(name_font)
+        achievement_entry = registered_font(achievement_font)
+        self.name_font = name_entry.font
+        self.achievement_font = achievement_entry.font
+        self.name_buffer = name_entry.buffer
+        self.achievement_buffer = achievement_entry.buffer
+        self.name_key = name_entry.key
+        self.achievement_key = achievement_entry.key
+
+    @classmethod
+    def coerce(cls, fonts):
+        """Accepts a CertificateFonts or a (name, achievement) pair of Fonts or font file bytes."""
+        if isinstance(fonts, cls):
+            return fonts
+        return cls(*fonts)
+
+    def buffers(self):
+        return self.name_buffer, self.achievement_buffer
+
+
+def plan_certificate(name, achievement, layout, fonts, page_width, page_height):
+    """Fits and breaks both text fields for one row without touching any page."""
+    fonts = CertificateFonts.coerce(fonts)
+
+    name_rect = layout.name_rect(page_width, page_height)
+    name_size = fit_fontsize(fonts.name_font, name_rect, name, layout.name_size, autoresize=layout.autoresize)
+    name_lines = tuple(break_lines(fonts.name_font, name, name_size, text_max_width(name_rect, layout.name_rot)))
+    name_box = tuple(shrink_offset_rect(name_rect, layout.name_size, name_size))
+
+    ach_rect = layout.ach_rect()
+    ach_size = fit_fontsize(fonts.achievement_font, ach_rect, achievement, layout.ach_size,
+                            autoresize=layout.autoresize)
+    ach_lines = tuple(break_lines(fonts.achievement_font, achievement, ach_size,
+                                  text_max_width(ach_rect, layout.ach_rot)))
+    ach_box = tuple(shrink_offset_rect(ach_rect, layout.ach_size, ach_size))
+    underline = _planned_underline(ach_box, ach_lines, fonts.achievement_font, ach_size, layout)
+
+    return CertificatePlan(name_box, name_size, name_lines, ach_box, ach_size, ach_lines, underline)
+
+
+def _planned_underline(ach_box, ach_lines, font, ach_size, layout):
+    segment = underline_segment(fitz.Rect(ach_box), ach_lines, font, ach_size, layout.ach_rot,
+                                layout.underline_spacing)
+    if segment is None:
+        return None
+    return (segment[0].x, segment[0].y, segment[1].x, segment[1].y)
+
+
+def _column_underlines(boxes, texts, lines, font, sizes, max_unit_widths, layout):
+    """
+    _planned_underline for a column of fitted achievements, as array arithmetic: the
+    same formulas as underline_segment, so the coordinates are identical. boxes maps
+    each size to its shifted box; rows without a non-empty line get None. A row whose
+    only line is its whole text reuses the width _fit_column measured.
+    """
+    if not lines:
+        return []
+    rotate = layout.ach_rot % 360
+    # Almost every achievement ends in a non-empty line; only the others are searched.
+    last = [len(row_lines) - 1 if row_lines and row_lines[-1].strip()
+            else next((i for i in range(len(row_lines) - 1, -1, -1) if row_lines[i].strip()), -1)
+            for row_lines in lines]
+    unit_widths = max_unit_widths.copy()
+    remeasure = [i for i, (text, row_lines) in enumerate(zip(texts, lines))
+                 if len(row_lines) != 1 or row_lines[0] != text]
+    if remeasure:
+        unit_widths[remeasure] = column_unit_widths(
+            font, [lines[i][last[i]] if last[i] >= 0 else "" for i in remeasure])
+
+    last = np.array(last, dtype=np.int64)
+    box_sizes, box_index = np.unique(np.array(sizes, dtype=np.float64), return_inverse=True)
+    sizes = box_sizes[box_index]
+    x0, y0, x1, y1 = np.array([boxes[size] for size in box_sizes.tolist()], dtype=np.float64)[box_index].T
+    ascender, descender = font.ascender, font.descender
+    line_height_factor = ascender - descender if ascender - descender > 1 else 1.2
+    # Per row: the shifted boxes' heights can differ in the last bits.
+    max_width = x1 - x0 if rotate in (0, 180) else y1 - y0
+
+    line_widths = unit_widths * sizes
+    y = ascender * sizes + last * (line_height_factor * ascender * sizes) - descender * sizes + layout.underline_spacing
+    start = (max_width - line_widths) / 2
+    start_x, start_y = _frame_to_page(x0, y0, x1, y1, start, y, rotate)
+    end_x, end_y = _frame_to_page(x0, y0, x1, y1, start + line_widths, y, rotate)
+    return [segment if index >= 0 else None
+            for index, segment in zip(last.tolist(), zip(start_x.tolist(), start_y.tolist(),
+                                                         end_x.tolist(), end_y.tolist()))]
+
+
+def _column_lines(font, rect, texts, sizes, max_unit_widths, rotate):
+    """
+    break_lines for a column of fitted texts. A text whose widest line is known to fit
+    keeps its own line breaks without being measured again.
+    """
+    max_width = text_max_width(rect, rotate)
+    lines = []
+    for text, size, unit_width in zip(texts, sizes, max_unit_widths.tolist()):
+        if unit_width * size <= max_width:
+            lines.append(tuple(text.splitlines()))
+        else:
+            lines.append(tuple(break_lines(font, text, size, max_width)))
+    return lines
+
+
+def plan_certificates(rows, layout, fonts, page_width, page_height):
+    """
+    plan_certificate for many (name, achievement) rows at once, fitting each text
+    column with fit_fontsizes. Returns one CertificatePlan per row, identical to
+    calling plan_certificate row by row.
+    """
+    fonts = CertificateFonts.coerce(fonts)
+    names = [name for name, _ in rows]
+    achievements = [achievement for _, achievement in rows]
+
+    name_rect = layout.name_rect(page_width, page_height)
+    name_sizes, name_widths = _fit_column(fonts.name_font, name_rect, names, layout.name_size,
+                                          autoresize=layout.autoresize)
+    name_lines = _column_lines(fonts.name_font, name_rect, names, name_sizes, name_widths, layout.name_rot)
+    ach_rect = layout.ach_rect()
+    ach_sizes, ach_widths = _fit_column(fonts.achievement_font, ach_rect, achievements, layout.ach_size,
+                                        autoresize=layout.autoresize)
+    ach_lines = _column_lines(fonts.achievement_font, ach_rect, achievements, ach_sizes, ach_widths,
+                              layout.ach_rot)
+
+    # Few distinct sizes occur, so rows share their shifted boxes.
+    name_boxes = {size: tuple(shrink_offset_rect(name_rect, layout.name_size, size)) for size in set(name_sizes)}
+    ach_boxes = {size: tuple(shrink_offset_rect(ach_rect, layout.ach_size, size)) for size in set(ach_sizes)}
+    underlines = _column_underlines(ach_boxes, achievements, ach_lines, fonts.achievement_font, ach_sizes,
+                                    ach_widths, layout)
+    return [CertificatePlan(name_boxes[name_size], name_size, name_line, ach_boxes[ach_size], ach_size, ach_line,
+                            underline)
+            for name_size, name_line, ach_size, ach_line, underline
+            in zip(name_sizes, name_lines, ach_sizes, ach_lines, underlines)]
+
+
+def plan_batch(rows, layout, fonts, page_width, page_height):
+    """The layout phase: plans every (name, achievement) row into a BatchPlan."""
+    fonts = CertificateFonts.coerce(fonts)
+    plans = plan_certificates(rows, layout, fonts, page_width, page_height)
+    entries = [(certificate_filename(name), name, achievement, plan)
+               for (name, achievement), plan in zip(rows, plans)]
+    return BatchPlan(layout, (page_width, page_height), (fonts.name_key, fonts.achievement_key), entries)
+
+
+def draw_certificate(page, name, achievement, plan, layout, fonts):
+    """Draws one row onto page exactly as plan says; no fitting or line breaking happens here."""
+    fonts = CertificateFonts.coerce(fonts)
+
+    page.insert_font(fontname=fonts.NAME_ALIAS, fontbuffer=fonts.name_buffer)
+    page.insert_font(fontname=fonts.ACHIEVEMENT_ALIAS, fontbuffer=fonts.achievement_buffer)
+
+    draw_text_lines(page, fitz.Rect(plan.name_box), plan.name_lines, fonts.name_font, fonts.NAME_ALIAS,
+                    plan.name_size, layout.name_rot)
+    draw_text_lines(page, fitz.Rect(plan.ach_box), plan.ach_lines, fonts.achievement_font,
+                    fonts.ACHIEVEMENT_ALIAS, plan.ach_size, layout.ach_rot)
+    if plan.underline is not None:
+        x0, y0, x1, y1 = plan.underline
+        page.draw_line(fitz.Point(x0, y0), fitz.Point(x1, y1), color=TEXT_COLOR,
+                       width=max(0.7, plan.ach_size * 0.05))
+
+
+def _overlay_text_lines(writer, rect, lines, font, font_alias, fontsize, rotate):
+    """draw_text_lines for an OverlayWriter."""
+    max_width, advance, first_baseline, to_page = _text_frame(rect, font, fontsize, rotate)
+    encoder = glyph_encoder(font)
+    for i, line in enumerate(lines):
+        if not line:
+            continue
+        x = (max_width - text_width(font, line, fontsize)) / 2
+        writer.text(to_page(x, first_baseline + i * advance), encoder.encode(line), font_alias, fontsize,
+                    rotate, TEXT_COLOR)
+
+
+def draw_certificate_overlay(page, plan, layout, fonts):
+    """
+    draw_certificate for the "direct" backend: writes the same text and underline as a
+    single content stream. page must already hold the fonts under their aliases, as
+    the pages of Template.new_document(fonts) do.
+    """
+    writer = OverlayWriter(page)
+    write_certificate_overlay(writer, plan, layout, fonts)
+    writer.commit()
+
+
+def write_certificate_overlay(writer, plan, layout, fonts):
+    """Adds one row's text and underline, as plan says, to an OverlayWriter."""
+    fonts = CertificateFonts.coerce(fonts)
+    _overlay_text_lines(writer, fitz.Rect(plan.name_box), plan.name_lines, fonts.name_font, fonts.NAME_ALIAS,
+                        plan.name_size, layout.name_rot)
+    _overlay_text_lines(writer, fitz.Rect(plan.ach_box), plan.ach_lines, fonts.achievement_font,
+                        fonts.ACHIEVEMENT_ALIAS, plan.ach_size, layout.ach_rot)
+    if plan.underline is not None:
+        x0, y0, x1, y1 = plan.underline
+        writer.line((x0, y0), (x1, y1), TEXT_COLOR, max(0.7, plan.ach_size * 0.05))
+
+
+def render_certificate_text(page, name, achievement, layout, fonts, page_width, page_height):
+    """Draws the name and the underlined achievement for one person onto page."""
+    fonts = CertificateFonts.coerce(fonts)
+    plan = plan_certificate(name, achievement, layout, fonts, page_width, page_height)
+    draw_certificate(page, name, achievement, plan, layout, fonts)
+
+
+class Template:
+    """
+    The template PDF, read from disk and parsed once per batch.
+    new_document() clones the parsed first page into a fresh in-memory document,
+    so rows never touch the template file again; new_document(fonts) clones a copy of
+    that page with the fonts already inserted, made once per font pair.
+    Template-level work of the save profile (image recompression) is done here, once.
+    """
+    def __init__(self, data, save_profile=None):
+        self.data = data
+        self.doc = fitz.open("pdf", data)
+        if not self.doc.page_count:
+            raise ValueError("This PDF has no pages.")
+        get_save_profile(save_profile).prepare_template(self.doc)
+        rect = self.doc[0].rect
+        self.page_width = int(rect.width)
+        self.page_height = int(rect.height)
+        self.metadata = self.doc.metadata
+        # Load every object once now, so clones copy already-parsed objects.
+        for xref in range(1, self.doc.xref_length()):
+            self.doc.xref_object(xref, compressed=True)
+        self._with_fonts = {}
+
+    @classmethod
+    def open(cls, template_path, save_profile=None):
+        with open(template_path, "rb") as infile:
+            return cls(infile.read(), save_profile)
+
+    def new_document(self, fonts=None):
+        source = self.doc if fonts is None else self._font_ready(CertificateFonts.coerce(fonts))
+        doc = fitz.open()
+        doc.insert_pdf(source, from_page=0, to_page=0)
+        doc.set_metadata(self.metadata)
+        return doc
+
+    def _font_ready(self, fonts):
+        key = (fonts.name_key, fonts.achievement_key)
+        prepared = self._with_fonts.get(key)
+        if prepared is None:
+            prepared = self.new_document()
+            page = prepared[0]
+            page.insert_font(fontname=fonts.NAME_ALIAS, fontbuffer=fonts.name_buffer)
+            page.insert_font(fontname=fonts.ACHIEVEMENT_ALIAS, fontbuffer=fonts.achievement_buffer)
+            # insert_text balances the template's q/Q before drawing; do it once here.
+            page.wrap_contents()
+            self._with_fonts[key] = prepared
+        return prepared
+
+    def close(self):
+        for prepared in self._with_fonts.values():
+            prepared.close()
+        self._with_fonts.clear()
+        self.doc.close()
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a batch when its BatchControl is cancelled."""
+
+
+class BatchControl:
+    """
+    Thread-safe pause / cancel switch for a running batch.
+    The batch calls checkpoint() before every row, so both take effect within one row.
+    """
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()  # wake a paused batch so it can stop
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def checkpoint(self):
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise GenerationCancelled()
+
+
+class GenerationSummary:
+    """Counts, timing and output size of one batch, for the CLI and GUI status messages."""
+    def __init__(self, count, rendered, total_bytes, elapsed, profile_name, skipped=0, measure_stats=None):
+        self.count = count
+        self.rendered = rendered
+        self.skipped = skipped
+        self.total_bytes = total_bytes
+        self.elapsed = elapsed
+        self.profile_name = profile_name
+        # MeasureStats of the text-width cache during this batch, or None.
+        self.measure_stats = measure_stats
+
+    @property
+    def ms_per_certificate(self):
+        return self.elapsed * 1000 / self.rendered if self.rendered else 0.0
+
+    @property
+    def bytes_per_certificate(self):
+        return self.total_bytes / self.rendered if self.rendered else 0.0
+
+    def __str__(self):
+        text = (f"{self.rendered} certificates in {self.elapsed:.2f}s with the '{self.profile_name}' save profile: "
+                f"{self.ms_per_certificate:.1f} ms and {self.bytes_per_certificate / 1024:.1f} KB per certificate")
+        if self.skipped:
+            text += f"; {self.skipped} already up to date"
+        if self.measure_stats is not None and self.measure_stats.lookups:
+            text += (f"; text width cache {self.measure_stats.hit_rate:.0%} hits "
+                     f"({self.measure_stats.lookups} lookups)")
+        return text
+
+
+def render_certificate(template, name, achievement, layout, fonts, plan=None, backend=None):
+    """
+    Returns a new document holding one row's certificate, ready to save. backend is a
+    name from RENDER_BACKENDS; both backends draw the same page.
+    """
+    if plan is None:
+        plan = plan_certificate(name, achievement, layout, fonts, template.page_width, template.page_height)
+    if get_render_backend(backend) == "direct":
+        doc = template.new_document(fonts)
+        draw_certificate_overlay(doc[0], plan, layout, fonts)
+    else:
+        doc = template.new_document()
+        draw_certificate(doc[0], name, achievement, plan, layout, fonts)
+    # Embed only the glyphs this certificate uses instead of the whole font files.
+    doc.subset_fonts()
+    return doc
+
+
+def certificate_bytes(template, name, achievement, layout, fonts, save_profile=None, plan=None, backend=None):
+    """Renders one row and returns the PDF as bytes instead of writing a file."""
+    doc = render_certificate(template, name, achievement, layout, fonts, plan, backend)
+    data = doc.tobytes(**get_save_profile(save_profile).save_kwargs())
+    doc.close()
+    return data
+
+
+# --- Process pool workers ---
+# Each worker process holds its own parsed template and fonts, set up once by _init_worker.
+_worker_state = {}
+
+
+def _init_worker(template_data, font_buffers, layout_dict, profile_name, backend):
+    # Workers are fresh interpreters; keep MuPDF's messages off stdout, which may carry an archive.
+    fitz.set_messages(fd=2)
+    _worker_state["template"] = Template(template_data, profile_name)
+    _worker_state["fonts"] = CertificateFonts(*font_buffers)
+    _worker_state["layout"] = Layout.from_dict(layout_dict)
+    _worker_state["profile"] = get_save_profile(profile_name)
+    _worker_state["backend"] = backend
+
+
+def _render_chunk(entries):
+    """Renders a chunk of (file name, name, achievement, plan) entries; returns (file name, PDF bytes) pairs."""
+    state = _worker_state
+    return [(filename,
+             certificate_bytes(state["template"], name, achievement, state["layout"], state["fonts"],
+                               state["profile"], plan, state["backend"]))
+            for filename, name, achievement, plan in entries]
+
+
+def _chunked(items, chunk_size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _unique_output_rows(certificate_data):
+    """
+    Rows sharing an output file are overwritten by the last one when run in order;
+    keep only that last one so the result does not depend on scheduling.
+    """
+    last_index = {certificate_filename(name): i for i, (name, _) in enumerate(certificate_data)}
+    return [(i, name, achievement) for i, (name, achievement) in enumerate(certificate_data)
+            if last_index[certificate_filename(name)] == i]
+
+
+def _auto_chunk_size(row_count, workers):
+    # A few chunks per worker keeps the cores busy when row costs vary.
+    return max(1, min(64, row_count // (workers * 4)))
+
+
+def resolve_workers(workers):
+    """0 or None means one worker per CPU core."""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, workers)
+
+
+def _render_pipeline(template, batch_plan, fonts, profile, workers, chunk_size, control, sink,
+                     backend=None, queue_size=8):
+    """
+    The render phase: runs the entries of batch_plan through the render -> write
+    stages, each on its own thread with bounded queues between them.
+    sink(file name, PDF bytes) is the write stage. With several workers the render
+    stage farms chunks out to a process pool, keeping at most two chunks per worker in flight.
+    The pool spawns fresh worker processes: forking here would copy a process whose
+    pipeline (and archive or GUI) threads are running, which can deadlock the children.
+    """
+    layout = batch_plan.layout
+
+    def render_stage(items):
+        for filename, name, achievement, plan in items:
+            if control is not None:
+                control.checkpoint()
+            yield filename, certificate_bytes(template, name, achievement, layout, fonts, profile, plan, backend)
+
+    def pool_render_stage(items):
+        pending = collections.deque()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker,
+                                 initargs=(template.data, fonts.buffers(), layout.to_dict(), profile.name,
+                                           backend)) as pool:
+            try:
+                for chunk in _chunked(items, chunk_size):
+                    if control is not None:
+                        control.checkpoint()
+                    pending.append(pool.submit(_render_chunk, chunk))
+                    while len(pending) >= workers * 2:
+                        yield from pending.popleft().result()
+                while pending:
+                    if control is not None:
+                        control.checkpoint()
+                    yield from pending.popleft().result()
+            except BaseException:
+                pool.shutdown(cancel_futures=True)
+                raise
+
+    def write_stage(items):
+        for filename, data in items:
+            sink(filename, data)
+            yield filename
+
+    if workers == 1 or len(batch_plan) < 2:
+        render = render_stage
+    else:
+        render = pool_render_stage
+        if chunk_size is None:
+            chunk_size = _auto_chunk_size(len(batch_plan), workers)
+    # Each queued item can hold a whole rendered PDF; keep the render -> write queue short.
+    run_pipeline(batch_plan.entries, [render, write_stage], queue_size=queue_size)
+
+
+def _layout_phase(template, rows, layout, fonts, plan_path):
+    """Plans every (name, achievement) row up front, writing the plan to plan_path if given."""
+    batch_plan = plan_batch(rows, layout, fonts, template.page_width, template.page_height)
+    if plan_path is not None:
+        batch_plan.save(plan_path)
+    return batch_plan
+
+
+def _open_measure_cache(path):
+    """Loads the on-disk text-width store, if any; returns the cache counters to diff against."""
+    if path is not None:
+        MEASURE_CACHE.load(path)
+    return MEASURE_CACHE.stats()
+
+
+def _close_measure_cache(path, start_stats):
+    if path is not None:
+        MEASURE_CACHE.save(path)
+    return MEASURE_CACHE.stats() - start_stats
+
+
+def generate_certificates(template_path, certificate_data, layout, output_folder, fonts=None,
+                          workers=1, chunk_size=None, save_profile=None, resume=True,
+                          progress=None, control=None, measure_cache=None, plan_path=None, backend=None):
+    """
+    Writes one "Certificate - <name>.pdf" per row of certificate_data into output_folder.
+    Every row is laid out first (see plan_batch); the plan is written to plan_path
+    (.json or .parquet) if given. Rendering and file writes then overlap in a threaded
+    pipeline; with workers > 1 (or 0 for all cores) rows are rendered by a process pool in chunks.
+    With resume, finished certificates are recorded in a manifest next to output_folder;
+    later runs only render rows whose data, or whose template, fonts, layout or save
+    profile, changed since, and leave every other output file untouched. The plan
+    still covers every row, rendered or not.
+    progress(done, total) is called after every written row; control (a BatchControl)
+    can pause or cancel the batch, which then raises GenerationCancelled. With a process
+    pool, chunks already handed to workers still finish after a cancel.
+    measure_cache is an optional JSON file of text widths, read before and updated after the batch.
+    backend picks how pages are drawn (see RENDER_BACKENDS); it does not change the result.
+    Returns a GenerationSummary.
+    """
+    start_time = time.perf_counter()
+    if fonts is None:
+        fonts = load_fonts()
+    fonts = CertificateFonts.coerce(fonts)
+    profile = get_save_profile(save_profile)
+    backend = get_render_backend(backend)
+    template = Template.open(template_path, profile)
+    measure_start = _open_measure_cache(measure_cache)
+    workers = resolve_workers(workers)
+
+    rows = _unique_output_rows(certificate_data)
+    batch_key = batch_fingerprint(template.data, fonts.buffers(), layout, profile.name)
+    row_keys = {certificate_filename(name): row_hash(batch_key, name, achievement) for _, name, achievement in rows}
+    manifest = None
+    complete = set()
+    if resume:
+        manifest = Manifest(manifest_path_for(output_folder))
+        complete = {filename for filename, key in row_keys.items()
+                    if manifest.is_complete(filename, key, output_folder)}
+    skipped = len(complete)
+    pending_count = len(rows) - skipped
+
+    rendered = 0
+    total_bytes = 0
+
+    def write(filename, data):
+        nonlocal rendered, total_bytes
+        with open(os.path.join(output_folder, filename), "wb") as outfile:
+            outfile.write(data)
+        rendered += 1
+        total_bytes += len(data)
+        if manifest is not None:
+            manifest.record(filename, row_keys[filename], len(data))
+        if progress is not None:
+            progress(rendered, pending_count)
+
+    try:
+        # Every row is laid out, so the exported plan covers the whole batch; only the
+        # rows the manifest does not already have are rendered.
+        batch_plan = _layout_phase(template, [(name, achievement) for _, name, achievement in rows],
+                                   layout, fonts, plan_path)
+        if complete:
+            batch_plan = batch_plan.without(complete)
+        if progress is not None:
+            progress(0, pending_count)
+        _render_pipeline(template, batch_plan, fonts, profile, workers, chunk_size, control, write, backend)
+    finally:
+        template.close()
+        if manifest is not None:
+            manifest.close()
+        measure_stats = _close_measure_cache(measure_cache, measure_start)
+
+    return GenerationSummary(len(certificate_data), rendered, total_bytes,
+                             time.perf_counter() - start_time, profile.name, skipped=skipped,
+                             measure_stats=measure_stats)
+
+
+def _shared_template_refs(page):
+    """
+    Returns the (resources, contents) references of the first combined page, whose
+    template XObject, fonts and template-drawing stream are shared by every later page.
+    """
+    doc = page.parent
+    _, resources = doc.xref_get_key(page.xref, "Resources")
+    _, contents = doc.xref_get_key(page.xref, "Contents")
+    template_stream = contents.strip("[]").split(" R")[0].strip() + " R"
+    return resources, template_stream
+
+
+def generate_combined(template_path, certificate_data, layout, output_path, fonts=None, chunk_size=500,
+                      save_profile=None, measure_cache=None, plan_path=None, backend=None):
+    """
+    Writes every row of certificate_data, in order, as one page of a single PDF.
+    The template page is stored once as a Form XObject shared by all pages, so each
+    page only adds its own text. Pages are flushed to output_path every chunk_size rows
+    with an incremental save, which keeps memory bounded for very large batches.
+    Rows are laid out first, as in generate_certificates.
+    Returns a GenerationSummary.
+    """
+    start_time = time.perf_counter()
+    if fonts is None:
+        fonts = load_fonts()
+    fonts = CertificateFonts.coerce(fonts)
+    profile = get_save_profile(save_profile)
+    backend = get_render_backend(backend)
+    template = Template.open(template_path, profile)
+    measure_start = _open_measure_cache(measure_cache)
+    page_rect = template.doc[0].rect
+    chunk_size = max(1, chunk_size)
+
+    count = 0
+    try:
+        batch_plan = _layout_phase(template, certificate_data, layout, fonts, plan_path)
+        for start in range(0, len(certificate_data), chunk_size):
+            if start == 0:
+                doc = fitz.open()
+                doc.set_metadata(template.metadata)
+                shared = None
+            else:
+                doc = fitz.open(output_path)
+                shared = _shared_template_refs(doc[0])
+
+            for _, name, achievement, plan in batch_plan.entries[start:start + chunk_size]:
+                page = doc.new_page(width=page_rect.width, height=page_rect.height)
+                if shared is None:
+                    page.show_pdf_page(page.rect, template.doc, 0)
+                else:
+                    # Point the page at the first page's resources and template stream
+                    # instead of showing the template again.
+                    resources, template_stream = shared
+                    doc.xref_set_key(page.xref, "Resources", resources)
+                    doc.xref_set_key(page.xref, "Contents", template_stream)
+
+                if backend == "direct":
+                    # Later pages share the first page's resources, fonts included.
+                    if shared is None:
+                        page.insert_font(fontname=fonts.NAME_ALIAS, fontbuffer=fonts.name_buffer)
+                        page.insert_font(fontname=fonts.ACHIEVEMENT_ALIAS, fontbuffer=fonts.achievement_buffer)
+                    draw_certificate_overlay(page, plan, layout, fonts)
+                else:
+                    draw_certificate(page, name, achievement, plan, layout, fonts)
+                if shared is None:
+                    shared = _shared_template_refs(page)
+                count += 1
+
+            if start == 0:
+                doc.save(output_path, **profile.save_kwargs())
+            else:
+                doc.saveIncr()
+            doc.close()
+    finally:
+        template.close()
+        measure_stats = _close_measure_cache(measure_cache, measure_start)
+
+    total_bytes = os.path.getsize(output_path) if count else 0
+    return GenerationSummary(count, count, total_bytes, time.perf_counter() - start_time, profile.name,
+                             measure_stats=measure_stats)
+
+
+def generate_archive(template_path, certificate_data, layout, target, archive_format="zip", fonts=None,
+                     workers=1, chunk_size=None, save_profile=None, progress=None, control=None,
+                     measure_cache=None, plan_path=None, backend=None):
+    """
+    Streams every certificate straight into a ZIP or TAR archive (a path or a binary
+    file object such as stdout), using the same member names as the loose output files.
+    Rows go through the same layout phase and render pipeline as generate_certificates;
+    compression and writing run on the ArchiveWriter thread while rows are rendered.
+    Returns a GenerationSummary.
+    """
+    start_time = time.perf_counter()
+    if fonts is None:
+        fonts = load_fonts()
+    fonts = CertificateFonts.coerce(fonts)
+    profile = get_save_profile(save_profile)
+    backend = get_render_backend(backend)
+    template = Template.open(template_path, profile)
+    measure_start = _open_measure_cache(measure_cache)
+    workers = resolve_workers(workers)
+    rows = _unique_output_rows(certificate_data)
+
+    def add(filename, data):
+        writer.add(filename, data)
+        if progress is not None:
+            progress(writer.members, len(rows))
+
+    try:
+        batch_plan = _layout_phase(template, [(name, achievement) for _, name, achievement in rows],
+                                   layout, fonts, plan_path)
+        with ArchiveWriter(target, archive_format) as writer:
+            _render_pipeline(template, batch_plan, fonts, profile, workers, chunk_size, control, add, backend)
+    finally:
+        template.close()
+        measure_stats = _close_measure_cache(measure_cache, measure_start)
+
+    return GenerationSummary(len(certificate_data), writer.members, writer.bytes_in,
+                             time.perf_counter() - start_time, profile.name, measure_stats=measure_stats)
@@ -0,0 +1,94 @@
+"""
+Process-wide font registry.
+
+Every font is loaded once per process and identified by a hash of its file bytes, so
+the GUI preview, the batch engine and the pool workers all share the same Font object
+and buffer. Building a Font from a buffer parses the whole file, and Font.buffer copies
+it on every access; neither should happen per row or per preview repaint.
+"""
+import os
+import hashlib
+import threading
+
+import pymupdf as fitz  # PyMuPDF
+
+
+class RegisteredFont:
+    """A loaded font with its file bytes and the hash that identifies it."""
+    __slots__ = ("key", "font", "buffer")
+
+    def __init__(self, key, font, buffer):
+        self.key = key
+        self.font = font
+        self.buffer = buffer
+
+
+_lock = threading.Lock()
+_by_key = {}
+# id() of a Font or buffer handed out or passed in -> (that object, entry). Holding the
+# object keeps its id from being reused, and saves hashing the same buffer again.
+_by_object = {}
+_by_file = {}
+_by_builtin = {}
+
+
+def font_key(buffer):
+    return hashlib.sha256(buffer).hexdigest()[:16]
+
+
+def _register(buffer, font=None):
+    key = font_key(buffer)
+    with _lock:
+        entry = _by_key.get(key)
+        if entry is None:
+            entry = RegisteredFont(key, font if font is not None else fitz.Font(fontbuffer=buffer), buffer)
+            _by_key[key] = entry
+            _by_object[id(entry.font)] = (entry.font, entry)
+        _by_object[id(buffer)] = (buffer, entry)
+        if font is not None:
+            _by_object[id(font)] = (font, entry)
+    return entry
+
+
+def font_from_buffer(buffer):
+    """Returns the registered font for these font file bytes, loading it on first use."""
+    known = _by_object.get(id(buffer))
+    if known is not None and known[0] is buffer:
+        return known[1]
+    return _register(bytes(buffer))
+
+
+def font_from_file(path):
+    """Returns the registered font for a font file. Raises like fitz.Font if it cannot be loaded."""
+    stat = os.stat(path)
+    file_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    entry = _by_file.get(file_key)
+    if entry is None:
+        with open(path, "rb") as infile:
+            buffer = infile.read()
+        entry = _register(buffer)
+        _by_file[file_key] = entry
+    return entry
+
+
+def builtin_font(name):
+    """Returns the registered font for a built-in font name such as "Helvetica-Bold"."""
+    entry = _by_builtin.get(name)
+    if entry is None:
+        font = fitz.Font(name)
+        entry = _register(font.buffer, font)
+        _by_builtin[name] = entry
+    return entry
+
+
+def registered_font(font):
+    """Accepts a RegisteredFont, a fitz.Font or font file bytes and returns its registry entry."""
+    if isinstance(font, RegisteredFont):
+        return font
+    known = _by_object.get(id(font))
+    if known is not None and known[0] is font:
+        return known[1]
+    if isinstance(font, fitz.Font):
+        # A Font built outside the registry: register it under its file bytes, read once.
+        return _register(font.buffer, font)
+    return font_from_buffer(font)
@@ -0,0 +1,108 @@
+"""
+On-disk manifest of finished certificates, used to resume interrupted batches and to
+regenerate only the rows that changed.
+
+The manifest is a JSON-lines file next to the output folder; each line records one
+finished certificate: output file name, row hash and byte size. The row hash covers
+the row's name and achievement together with a fingerprint of everything else that
+shapes the page (template bytes, font files, layout, save profile), so a certificate
+is rendered again exactly when its own data or the shared inputs change.
+Records are buffered and appended in batches without fsync, so a crash loses at most
+the last few records, and those rows are simply rendered again.
+"""
+import os
+import json
+import time
+import hashlib
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def batch_fingerprint(template_data, font_buffers, layout, profile_name):
+    layout_json = json.dumps(layout.to_dict(), sort_keys=True)
+    return _digest(template_data, *font_buffers, layout_json, profile_name)
+
+
+def row_hash(batch_key, name, achievement):
+    return _digest(batch_key, name, achievement)[:32]
+
+
+def manifest_path_for(output_folder):
+    output_folder = os.path.abspath(output_folder)
+    return os.path.join(os.path.dirname(output_folder), os.path.basename(output_folder) + ".manifest.jsonl")
+
+
+class Manifest:
+    """Tracks finished certificates by output file name; the latest record per file wins."""
+    def __init__(self, path, flush_every=200, flush_interval=2.0):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.entries = {}
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._load()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _load(self):
+        lines = 0
+        torn = False
+        if os.path.exists(self.path):
+            with open(self.path, mode='r', encoding='utf-8') as infile:
+                for line in infile:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        torn = True  # a half-written last line from an interrupted run
+                        continue
+                    lines += 1
+                    if "file" in record:
+                        self.entries[record["file"]] = record
+
+        if torn or lines > 2 * len(self.entries):
+            # Rewrite with only the latest record per certificate, so appends start on a clean line.
+            with open(self.path, mode='w', encoding='utf-8') as outfile:
+                for record in self.entries.values():
+                    outfile.write(json.dumps(record) + "\n")
+
+    def is_complete(self, filename, row_key, output_folder):
+        record = self.entries.get(filename)
+        if record is None or record["hash"] != row_key:
+            return False
+        try:
+            return os.path.getsize(os.path.join(output_folder, filename)) == record["size"]
+        except OSError:
+            return False
+
+    def record(self, filename, row_key, size):
+        record = {"file": filename, "hash": row_key, "size": size}
+        self.entries[filename] = record
+        self._pending.append(json.dumps(record) + "\n")
+        if (len(self._pending) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._file.write("".join(self._pending))
+            self._file.flush()
+            self._pending = []
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
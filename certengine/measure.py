@@ -0,0 +1,116 @@
+"""
+Memoized text measurement.
+
+Font.text_length walks the string in Python, one glyph lookup per character, and the
+same names and achievement titles are measured again and again: by the fit for every
+size it tries, by the line wrap, and across rows and runs. A text's width is its
+width at 1pt times the font size, so widths are cached per (font hash, text) at 1pt
+and scaled, which gives exactly what text_length returns for any size.
+Misses are measured from the font's glyph advance table (see advances.py) rather than
+text_length, with the same result.
+
+The cache is an in-memory LRU; it can also be loaded from and saved to a JSON file so
+later runs start warm.
+"""
+import os
+import json
+import threading
+import collections
+
+from .fonts import registered_font
+from .advances import advance_table
+
+CACHE_VERSION = 1
+
+
+class MeasureStats:
+    def __init__(self, hits=0, misses=0):
+        self.hits = hits
+        self.misses = misses
+
+    @property
+    def lookups(self):
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def __sub__(self, other):
+        return MeasureStats(self.hits - other.hits, self.misses - other.misses)
+
+
+class TextMeasureCache:
+    """LRU cache of 1pt text widths keyed by (font key, text)."""
+    def __init__(self, max_entries=100_000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._widths = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def unit_width(self, font, text):
+        """Width of text at 1pt. font is anything registered_font accepts."""
+        entry = registered_font(font)
+        key = (entry.key, text)
+        with self._lock:
+            width = self._widths.get(key)
+            if width is not None:
+                self._widths.move_to_end(key)
+                self.hits += 1
+                return width
+        width = advance_table(entry).unit_width(text)
+        with self._lock:
+            self.misses += 1
+            self._widths[key] = width
+            if len(self._widths) > self.max_entries:
+                self._widths.popitem(last=False)
+        return width
+
+    def text_length(self, font, text, fontsize):
+        return self.unit_width(font, text) * fontsize
+
+    def clear(self):
+        with self._lock:
+            self._widths.clear()
+
+    def stats(self):
+        return MeasureStats(self.hits, self.misses)
+
+    def __len__(self):
+        return len(self._widths)
+
+    def load(self, path):
+        """Adds the widths saved in path; a missing or unreadable file is ignored."""
+        try:
+            with open(path, mode='r', encoding='utf-8') as infile:
+                data = json.load(infile)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != CACHE_VERSION:
+            return
+        with self._lock:
+            for font_key, widths in data.get("widths", {}).items():
+                for text, width in widths.items():
+                    self._widths.setdefault((font_key, text), width)
+            while len(self._widths) > self.max_entries:
+                self._widths.popitem(last=False)
+
+    def save(self, path):
+        with self._lock:
+            widths = {}
+            for (font_key, text), width in self._widths.items():
+                widths.setdefault(font_key, {})[text] = width
+        temp_path = path + ".tmp"
+        with open(temp_path, mode='w', encoding='utf-8') as outfile:
+            json.dump({"version": CACHE_VERSION, "widths": widths}, outfile, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+
+# The process-wide cache used by the layout code.
+MEASURE_CACHE = TextMeasureCache()
+
+
+def text_width(font, text, fontsize):
+    """Cached equivalent of font.text_length(text, fontsize=fontsize)."""
+    return MEASURE_CACHE.unit_width(font, text) * fontsize
@@ -0,0 +1,159 @@
+"""
+Direct overlay content streams.
+
+The default render backend draws every line with page.insert_text and the underline
+with page.draw_line. Each call looks the font up on the page again, checks the page's
+q/Q balance and adds a content stream object of its own, and page.insert_font parses
+both font files for every row. Once a row is planned, its overlay is a few BT/ET
+blocks and one line path, so the "direct" backend writes exactly those operators
+itself: glyph ids are looked up once per character and font, and each row appends a
+single content stream to a page that already holds the fonts. The operators match
+what insert_text and draw_line write, so both backends produce the same pages.
+"""
+import threading
+
+import pymupdf as fitz  # PyMuPDF
+
+from .fonts import registered_font
+
+RENDER_BACKENDS = {
+    "pymupdf": "page.insert_text and page.draw_line for every line (the default)",
+    "direct": "one precomputed content stream per certificate; fastest",
+}
+
+DEFAULT_RENDER_BACKEND = "pymupdf"
+
+# insert_text's rotation of the text space, written inside the BT block.
+_ROTATE_CM = {
+    0: "",
+    90: "0 1 -1 0 0 0 cm\n",
+    180: "-1 0 0 -1 0 0 cm\n",
+    270: "0 -1 1 0 0 0 cm\n",
+}
+
+
+def get_render_backend(backend):
+    """Validates a backend name; None means the default."""
+    if backend is None:
+        return DEFAULT_RENDER_BACKEND
+    if backend not in RENDER_BACKENDS:
+        raise ValueError(f"Unknown render backend '{backend}'. Choose from: {', '.join(RENDER_BACKENDS)}")
+    return backend
+
+
+def pdf_number(value):
+    """A number formatted as insert_text and draw_line write it, with MuPDF's own %g."""
+    return fitz.mupdf.fz_format_double("%g", value)
+
+
+def _path_number(value):
+    # draw_line rounds path coordinates to five decimals before formatting them.
+    return pdf_number(round(value, 5) if abs(value) >= 1e-4 else 0)
+
+
+def _pdf_color(color):
+    return " ".join(pdf_number(component) for component in color)
+
+
+class GlyphEncoder:
+    """
+    Encodes text for a font embedded by page.insert_font (a Type0 font with Identity-H
+    encoding): four hex digits of glyph id per character, as insert_text writes them.
+    """
+    def __init__(self, font):
+        self.font = registered_font(font).font
+        self._codes = {}
+
+    def encode(self, text):
+        codes = self._codes
+        try:
+            return "".join(map(codes.__getitem__, text))
+        except KeyError:
+            for char in text:
+                if char not in codes:
+                    codes[char] = f"{self.font.has_glyph(ord(char)):04x}"
+            return "".join(map(codes.__getitem__, text))
+
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def glyph_encoder(font):
+    """Returns the shared GlyphEncoder for a Font, font file bytes or RegisteredFont."""
+    entry = registered_font(font)
+    encoder = _encoders.get(entry.key)
+    if encoder is None:
+        with _encoders_lock:
+            encoder = _encoders.setdefault(entry.key, GlyphEncoder(entry))
+    return encoder
+
+
+class OverlayWriter:
+    """
+    Collects text and line operators for one page and appends them as a single
+    content stream. Points are in page coordinates, as for page.insert_text and
+    page.draw_line; the page must already hold the fonts under the aliases used.
+    """
+    def __init__(self, page):
+        self.page = page
+        # The same page geometry Shape (behind insert_text and draw_line) works with.
+        self.height = page.mediabox_size.y
+        self.x = page.cropbox_position.x
+        self.y = page.cropbox_position.y
+        self.inverse_ctm = ~page.transformation_matrix
+        self.parts = []
+
+    def text(self, point, encoded, font_alias, fontsize, rotate, color):
+        """One line of already encoded text with its baseline starting at point."""
+        if rotate % 90:
+            raise ValueError(f"Text can only be rotated by a multiple of 90 degrees, not {rotate}")
+        rotate %= 360
+        left = point.x + self.x
+        top = self.height - point.y - self.y
+        if rotate == 90:
+            left, top = self.height - point.y - self.y, -point.x - self.x
+        elif rotate == 270:
+            left, top = -self.height + point.y + self.y, point.x + self.x
+        elif rotate == 180:
+            left, top = -point.x - self.x, -self.height + point.y + self.y
+        color = _pdf_color(color)
+        self.parts.append(
+            f"\nq\nBT\n{_ROTATE_CM[rotate]}1 0 0 1 {pdf_number(left)} {pdf_number(top)} Tm\n"
+            f"/{font_alias} {pdf_number(fontsize)} Tf {color} RG {color} rg [<{encoded}>]TJ\nET\nQ\n")
+
+    def line(self, start, end, color, width):
+        start = fitz.Point(start) * self.inverse_ctm
+        end = fitz.Point(end) * self.inverse_ctm
+        width_op = f"{pdf_number(width)} w\n" if width != 1 else ""
+        self.parts.append(
+            f"\nq\n{_path_number(start.x)} {_path_number(start.y)} m\n{_path_number(end.x)} {_path_number(end.y)} l\n"
+            f"{width_op}{_pdf_color(color)} RG S\nQ\n")
+
+    def rect(self, rect, color, width):
+        """A stroked rectangle, as page.draw_rect draws it."""
+        rect = fitz.Rect(rect)
+        corner = rect.bl * self.inverse_ctm
+        numbers = " ".join(_path_number(value) for value in (corner.x, corner.y, rect.width, rect.height))
+        width_op = f"{pdf_number(width)} w\n" if width != 1 else ""
+        self.parts.append(f"\nq\n{numbers} re\n{width_op}h\n{_pdf_color(color)} RG S\nQ\n")
+
+    def content(self):
+        """Everything collected so far, as content stream bytes."""
+        return "".join(self.parts).encode()
+
+    def commit(self):
+        """Appends everything collected so far to the page's /Contents as one stream."""
+        if not self.parts:
+            return
+        doc = self.page.parent
+        xref = doc.get_new_xref()
+        doc.update_object(xref, "<<>>")
+        doc.update_stream(xref, self.content())
+        kind, contents = doc.xref_get_key(self.page.xref, "Contents")
+        if kind == "array":
+            contents = contents.strip()[1:-1]
+        elif kind == "null":
+            contents = ""
+        doc.xref_set_key(self.page.xref, "Contents", f"[{contents} {xref} 0 R]")
+        self.parts = []
@@ -0,0 +1,88 @@
+"""
+A small threaded pipeline: each stage runs on its own thread and hands items to the
+next through a bounded queue. The queues cap how much work is in flight (and so peak
+memory) and make fast stages wait for slow ones, so the total time approaches that of
+the slowest stage rather than the sum of all of them.
+"""
+import queue
+import threading
+
+_END = object()
+
+
+class _Channel:
+    """Bounded queue between two stages. closed is set once the consumer stops reading."""
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.closed = threading.Event()
+
+    def put(self, item):
+        """Returns False (dropping item) if the consumer has stopped."""
+        while not self.closed.is_set():
+            try:
+                self.queue.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is _END:
+                return
+            yield item
+
+
+def run_pipeline(source, stages, queue_size=8, name="certengine"):
+    """
+    Feeds the items of source through stages and waits for all of them to finish.
+
+    Each stage is a function taking an iterator of items and yielding items for the
+    next stage; whatever the last stage yields is discarded. If a stage raises, the
+    stages before it stop early while the stages after it still finish the items they
+    already received. The first exception is then re-raised here.
+    """
+    channels = [_Channel(queue_size) for _ in stages]
+    errors = []
+
+    def feed():
+        try:
+            for item in source:
+                if not channels[0].put(item):
+                    break
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            channels[0].put(_END)
+
+    def run_stage(index):
+        stage = stages[index]
+        output = channels[index + 1] if index + 1 < len(channels) else None
+        try:
+            for item in stage(iter(channels[index])):
+                if output is not None and not output.put(item):
+                    break
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            channels[index].closed.set()
+            # Unblock the producer if it is waiting on a full queue.
+            try:
+                while True:
+                    channels[index].queue.get_nowait()
+            except queue.Empty:
+                pass
+            if output is not None:
+                output.put(_END)
+
+    threads = [threading.Thread(target=feed, name=f"{name}-ingest", daemon=True)]
+    threads += [threading.Thread(target=run_stage, args=(i,), name=f"{name}-stage-{i}", daemon=True)
+                for i in range(len(stages))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
@@ -0,0 +1,131 @@
+"""
+Layout plans.
+
+Generation runs in two phases. The layout phase resolves, for every row, the fitted
+font sizes, the shifted boxes (the vertical offset), the line breaks and the
+underline coordinates into a CertificatePlan; the render phase only executes plans.
+A BatchPlan holds the plans of a whole batch and can be written as JSON or Parquet
+for review, caching and diffing.
+"""
+import json
+import importlib.util
+
+PLAN_VERSION = 1
+
+# The engines pandas can write Parquet with, in the order it tries them.
+PARQUET_ENGINES = ("pyarrow", "fastparquet")
+
+
+def parquet_engine():
+    """The name of an installed Parquet engine, or None if there is none."""
+    return next((engine for engine in PARQUET_ENGINES if importlib.util.find_spec(engine) is not None), None)
+
+
+def is_parquet_path(path):
+    return path.lower().endswith(".parquet")
+
+
+class CertificatePlan:
+    """
+    The layout step's result for one row: fitted font sizes, the (x0, y0, x1, y1) boxes
+    the name and achievement are drawn into, the lines each is broken into and the
+    achievement's (x0, y0, x1, y1) underline, or None. Plain numbers and strings, so it
+    pickles cheaply.
+    """
+    __slots__ = ("name_box", "name_size", "name_lines", "ach_box", "ach_size", "ach_lines", "underline")
+
+    def __init__(self, name_box, name_size, name_lines, ach_box, ach_size, ach_lines, underline=None):
+        self.name_box = name_box
+        self.name_size = name_size
+        self.name_lines = name_lines
+        self.ach_box = ach_box
+        self.ach_size = ach_size
+        self.ach_lines = ach_lines
+        self.underline = underline
+
+    def __getstate__(self):
+        return (self.name_box, self.name_size, self.name_lines,
+                self.ach_box, self.ach_size, self.ach_lines, self.underline)
+
+    def __setstate__(self, state):
+        (self.name_box, self.name_size, self.name_lines,
+         self.ach_box, self.ach_size, self.ach_lines, self.underline) = state
+
+    def to_dict(self):
+        return {
+            "name_box": list(self.name_box),
+            "name_size": self.name_size,
+            "name_lines": list(self.name_lines),
+            "ach_box": list(self.ach_box),
+            "ach_size": self.ach_size,
+            "ach_lines": list(self.ach_lines),
+            "underline": list(self.underline) if self.underline is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        underline = data.get("underline")
+        return cls(tuple(data["name_box"]), data["name_size"], tuple(data["name_lines"]),
+                   tuple(data["ach_box"]), data["ach_size"], tuple(data["ach_lines"]),
+                   tuple(underline) if underline is not None else None)
+
+
+class BatchPlan:
+    """
+    The layout phase's output for a batch: one (file name, name, achievement, plan)
+    entry per row, with the layout, page size and font keys the plans were made for.
+    """
+    def __init__(self, layout, page_size, font_keys, entries):
+        self.layout = layout
+        self.page_size = tuple(page_size)
+        self.font_keys = tuple(font_keys)
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def without(self, filenames):
+        """A BatchPlan of the same batch with the entries for filenames left out."""
+        entries = [entry for entry in self.entries if entry[0] not in filenames]
+        return BatchPlan(self.layout, self.page_size, self.font_keys, entries)
+
+    def records(self):
+        """One flat dict per row, as written to the JSON and Parquet files."""
+        return [dict(file=filename, name=name, achievement=achievement, **plan.to_dict())
+                for filename, name, achievement, plan in self.entries]
+
+    def save(self, path):
+        """Writes the plan as Parquet if path ends in .parquet, otherwise as JSON."""
+        if is_parquet_path(path):
+            self._save_parquet(path)
+            return
+        header = {
+            "version": PLAN_VERSION,
+            "layout": self.layout.to_dict(),
+            "page_size": list(self.page_size),
+            "font_keys": list(self.font_keys),
+        }
+        # One row per line, so two plans diff row by row.
+        with open(path, mode='w', encoding='utf-8') as outfile:
+            outfile.write(json.dumps(header, ensure_ascii=False)[:-1] + ', "rows": [\n')
+            outfile.write(",\n".join(json.dumps(record, ensure_ascii=False) for record in self.records()))
+            outfile.write("\n]}\n")
+
+    def _save_parquet(self, path):
+        engine = parquet_engine()
+        if engine is None:
+            raise ImportError("Writing a Parquet plan needs pyarrow (the 'parquet' extra) or fastparquet; "
+                              "install one, or save the plan as .json")
+        import pandas as pd
+        pd.DataFrame.from_records(self.records()).to_parquet(path, engine=engine, index=False)
+
+    @classmethod
+    def load(cls, path, layout_type):
+        """Reads a JSON plan; layout_type rebuilds the layout (certengine.Layout)."""
+        with open(path, mode='r', encoding='utf-8') as infile:
+            data = json.load(infile)
+        if data.get("version") != PLAN_VERSION:
+            raise ValueError(f"Unsupported plan version in '{path}'")
+        entries = [(row["file"], row["name"], row["achievement"], CertificatePlan.from_dict(row))
+                   for row in data["rows"]]
+        return cls(layout_type.from_dict(data["layout"]), data["page_size"], data["font_keys"], entries)
@@ -0,0 +1,77 @@
+"""
+Live preview rendering for the GUI.
+
+The template does not change while a slider is dragged or text is typed, so its page
+is rasterized once per zoom level and kept. A preview frame only rasterizes the
+overlay (the achievement box outline, the fitted text and the underline), written as
+one content stream onto an otherwise empty page of the same size that already holds
+the fonts. The GUI composites that transparent overlay onto the cached background.
+"""
+import collections
+
+import pymupdf as fitz  # PyMuPDF
+
+from .engine import CertificateFonts, plan_certificate, write_certificate_overlay
+from .overlay import OverlayWriter
+
+BOX_COLOR = (1, 0, 0)
+BOX_WIDTH = 1.5
+
+
+class PreviewRenderer:
+    """
+    Renders preview frames for one template page and font pair. zoom is the scale
+    from PDF points to pixels. Not thread-safe: use one renderer per thread.
+    """
+    def __init__(self, template_doc, fonts, max_backgrounds=4):
+        self.fonts = CertificateFonts.coerce(fonts)
+        rect = template_doc[0].rect
+        self.page_width = int(rect.width)
+        self.page_height = int(rect.height)
+        self.max_backgrounds = max_backgrounds
+        self._backgrounds = collections.OrderedDict()
+
+        # The template shown on a page of the preview's size, like the GUI has always drawn it.
+        self._background_doc = fitz.open()
+        page = self._background_doc.new_page(width=self.page_width, height=self.page_height)
+        page.show_pdf_page(page.rect, template_doc, 0)
+
+        self._overlay_doc = fitz.open()
+        page = self._overlay_doc.new_page(width=self.page_width, height=self.page_height)
+        page.insert_font(fontname=self.fonts.NAME_ALIAS, fontbuffer=self.fonts.name_buffer)
+        page.insert_font(fontname=self.fonts.ACHIEVEMENT_ALIAS, fontbuffer=self.fonts.achievement_buffer)
+        # One content stream, replaced on every frame.
+        self._overlay_xref = self._overlay_doc.get_new_xref()
+        self._overlay_doc.update_object(self._overlay_xref, "<<>>")
+        self._overlay_doc.update_stream(self._overlay_xref, b" ")
+        self._overlay_doc.xref_set_key(page.xref, "Contents", f"{self._overlay_xref} 0 R")
+
+    def background(self, zoom=1.0):
+        """The template page as an RGB Pixmap at zoom, rasterized once per zoom level."""
+        pixmap = self._backgrounds.get(zoom)
+        if pixmap is None:
+            pixmap = self._background_doc[0].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            self._backgrounds[zoom] = pixmap
+            if len(self._backgrounds) > self.max_backgrounds:
+                self._backgrounds.popitem(last=False)
+        else:
+            self._backgrounds.move_to_end(zoom)
+        return pixmap
+
+    def overlay(self, name, achievement, layout, zoom=1.0):
+        """
+        The box outline and the fitted, underlined text for one row as a Pixmap with
+        premultiplied alpha, transparent everywhere else.
+        """
+        page = self._overlay_doc[0]
+        plan = plan_certificate(name, achievement, layout, self.fonts, self.page_width, self.page_height)
+        writer = OverlayWriter(page)
+        writer.rect(layout.ach_rect(), BOX_COLOR, BOX_WIDTH)
+        write_certificate_overlay(writer, plan, layout, self.fonts)
+        self._overlay_doc.update_stream(self._overlay_xref, writer.content() or b" ")
+        return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=True)
+
+    def close(self):
+        self._backgrounds.clear()
+        self._background_doc.close()
+        self._overlay_doc.close()
@@ -3,6 +3,8 @@ import fitz  # PyMuPDF
 from tkinter import filedialog, messagebox
 from PIL import Image
 
+from certengine.profiles import save_kwargs
+
 class PdfTextEditor(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -189,7 +191,7 @@ class PdfTextEditor(ctk.CTk):
         )
         
         try:
-            final_doc.save(save_path, garbage=4, deflate=True)
+            final_doc.save(save_path, **save_kwargs("classic"))
             messagebox.showinfo("Success", f"PDF saved successfully to:\n{save_path}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save PDF: {e}")
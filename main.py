@@ -1,19 +1,170 @@
 import sys
 import os
-import csv
-import re
-import math # Needed for rotation calculation
+import time
+import string
+import threading
+import contextlib
 import fitz  # PyMuPDF
 
+import certengine
+
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QFormLayout,
     QPushButton, QLabel, QLineEdit, QSlider, QFileDialog, QMessageBox, QTabWidget,
-    QCheckBox, QSpinBox
+    QCheckBox, QSpinBox, QComboBox, QProgressBar, QSizePolicy
 )
-from PyQt6.QtGui import QPixmap, QImage, QFont
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtGui import QPixmap, QImage, QFont, QPainter
+from PyQt6.QtCore import Qt, QSize, QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+
+class GenerationWorker(QObject):
+    """Runs certengine.generate_certificates on a QThread and reports back through signals."""
+    progress = pyqtSignal(int, int)
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    # Minimum seconds between progress signals, so big batches don't flood the event loop.
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, template_path, certificate_data, layout, output_folder, font_buffers, save_profile):
+        super().__init__()
+        self.template_path = template_path
+        self.certificate_data = [list(row) for row in certificate_data]
+        self.layout = layout
+        self.output_folder = output_folder
+        self.font_buffers = font_buffers
+        self.save_profile = save_profile
+        self.control = certengine.BatchControl()
+        self._last_emit = 0.0
+
+    def report_progress(self, done, total):
+        now = time.monotonic()
+        if done == total or now - self._last_emit >= self.PROGRESS_INTERVAL:
+            self._last_emit = now
+            self.progress.emit(done, total)
+
+    def run(self):
+        try:
+            fonts = certengine.CertificateFonts(*self.font_buffers)
+            summary = certengine.generate_certificates(self.template_path, self.certificate_data, self.layout,
+                                                       self.output_folder, fonts=fonts,
+                                                       save_profile=self.save_profile,
+                                                       progress=self.report_progress, control=self.control)
+            self.succeeded.emit(summary)
+        except certengine.GenerationCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class PreviewJob:
+    """Everything one preview frame depends on, captured on the UI thread."""
+    __slots__ = ("sequence", "template_id", "template_path", "name", "achievement", "layout", "zoom",
+                 "device_pixel_ratio")
+
+    def __init__(self, sequence, template_id, template_path, name, achievement, layout, zoom, device_pixel_ratio):
+        self.sequence = sequence
+        self.template_id = template_id
+        self.template_path = template_path
+        self.name = name
+        self.achievement = achievement
+        self.layout = layout
+        self.zoom = zoom
+        self.device_pixel_ratio = device_pixel_ratio
+
+
+class PreviewWorker(QObject):
+    """
+    Renders preview frames on its own QThread, with its own template document and
+    certengine.PreviewRenderer. submit() only keeps the newest job: jobs replaced
+    before the worker gets to them are never rendered.
+    """
+    frame_ready = pyqtSignal(int, QImage)
+    failed = pyqtSignal(int, str)
+    wake = pyqtSignal()
+
+    def __init__(self, fonts):
+        super().__init__()
+        self.fonts = fonts
+        self.renderer = None
+        self.template_id = None
+        self.background = None
+        self._job = None
+        self._lock = threading.Lock()
+        self.wake.connect(self.render_pending)
+
+    def submit(self, job):
+        """Called from the UI thread; never waits for a render."""
+        with self._lock:
+            idle = self._job is None
+            self._job = job
+        if idle:
+            self.wake.emit()
+
+    @pyqtSlot()
+    def warm_up(self):
+        # Measure the fonts' common glyphs before the first preview needs them.
+        for font in (self.fonts.name_font, self.fonts.achievement_font):
+            certengine.column_unit_widths(font, [string.printable])
+
+    # A declared slot runs in the worker's thread; a plain method connected before
+    # moveToThread would run in the UI thread.
+    @pyqtSlot()
+    def render_pending(self):
+        with self._lock:
+            job, self._job = self._job, None
+        if job is None:
+            return
+        try:
+            frame = self.render(job)
+        except Exception as e:
+            self.failed.emit(job.sequence, str(e))
+            return
+        self.frame_ready.emit(job.sequence, frame)
+
+    def render(self, job):
+        """Paints the job's text overlay onto the cached template background and returns the QImage."""
+        if job.template_id != self.template_id:
+            self.close()
+            template_doc = fitz.open(job.template_path)
+            try:
+                self.renderer = certengine.PreviewRenderer(template_doc, self.fonts)
+            finally:
+                template_doc.close()
+            self.template_id = job.template_id
+
+        if self.background is None or self.background[0] != job.zoom:
+            background = self.renderer.background(job.zoom)
+            image = QImage(background.samples, background.width, background.height, background.stride,
+                           QImage.Format.Format_RGB888)
+            self.background = (job.zoom, image.convertToFormat(QImage.Format.Format_RGB32))
+
+        overlay = self.renderer.overlay(job.name, job.achievement, job.layout, job.zoom)
+        samples = overlay.samples
+        overlay_image = QImage(samples, overlay.width, overlay.height, overlay.stride,
+                               QImage.Format.Format_RGBA8888_Premultiplied)
+        frame = self.background[1].copy()
+        painter = QPainter(frame)
+        painter.drawImage(0, 0, overlay_image)
+        painter.end()
+        frame.setDevicePixelRatio(job.device_pixel_ratio)
+        return frame
+
+    def close(self):
+        if self.renderer is not None:
+            self.renderer.close()
+        self.renderer = None
+        self.template_id = None
+        self.background = None
+
 
 class PdfCertificateGenerator(QMainWindow):
+    # Preview requests arriving within this many milliseconds are merged into one render (about 60 fps).
+    PREVIEW_INTERVAL_MS = 16
+    # While the window is resized the last frame is stretched; it is rendered again once
+    # the size has not changed for this many milliseconds.
+    RESIZE_SETTLE_MS = 150
+
     def __init__(self):
         super().__init__()
 
@@ -22,34 +173,44 @@ class PdfCertificateGenerator(QMainWindow):
 
         # --- Data Attributes ---
         self.doc_template = None
+        # Live preview, rendered off the UI thread. Every request gets the next sequence
+        # number; a finished frame older than the one on screen is dropped.
+        self.template_id = 0
+        self.preview_sequence = 0
+        self.preview_shown_sequence = 0
+        # At most one preview render is pending; it draws whatever the controls say when it runs.
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(self.PREVIEW_INTERVAL_MS)
+        self.preview_timer.timeout.connect(self.update_display)
+        self.preview_suppressed = 0
+        self.first_preview_started = None
+        self.preview_pixmap = None
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(self.RESIZE_SETTLE_MS)
+        self.resize_timer.timeout.connect(self.update_display)
         self.page_width = 0
         self.page_height = 0
         self.template_path = ""
         self.csv_path = ""
         self.output_folder = ""
         self.certificate_data = []
-
-        # Create font objects
-        self.font_name_bold = fitz.Font("Helvetica-Bold")
-
-        # --- Load Achievement Font (Custom with Fallback) ---
-        try:
-            # IMPORTANT: The font file must be in the same directory as the script.
-            # Change the filename below if yours is different (e.g., "Brixton Medium.ttf")
-            font_filename = "Brixton_Medium.ttf"
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            font_path = os.path.join(script_dir, font_filename)
-
-            # Try to load the custom font from the file
-            self.font_achievement_reg = fitz.Font(filename=font_path)
-            print(f"Successfully loaded custom font: {font_filename}")
-
-        except Exception as e:
-            # If loading fails, print a warning and fall back to the default Helvetica font
-            print(f"WARNING: Could not load custom font '{font_filename}'. Falling back to Helvetica.")
-            print(f"Error details: {e}")
-            self.font_achievement_reg = fitz.Font("Helvetica")
-
+        self.generation_thread = None
+        self.generation_worker = None
+
+        # Create font objects (name: Helvetica-Bold, achievement: Brixton_Medium.ttf with Helvetica fallback)
+        self.font_name_bold, self.font_achievement_reg = certengine.load_fonts()
+        self.fonts = certengine.CertificateFonts(self.font_name_bold, self.font_achievement_reg)
+
+        # The preview worker needs the fonts, so it starts here.
+        self.preview_worker = PreviewWorker(self.fonts)
+        self.preview_thread = QThread(self)
+        self.preview_worker.moveToThread(self.preview_thread)
+        self.preview_thread.started.connect(self.preview_worker.warm_up)
+        self.preview_worker.frame_ready.connect(self.show_preview_frame)
+        self.preview_worker.failed.connect(self.on_preview_failed)
+        self.preview_thread.start()
 
         # --- Main Layout ---
         central_widget = QWidget()
@@ -107,7 +268,7 @@ class PdfCertificateGenerator(QMainWindow):
         self.underline_spacing.setValue(0)  # Default spacing
         self.underline_spacing.setSuffix(" px")
         self.underline_spacing.setToolTip("Distance between text and underline (in pixels)")
-        self.underline_spacing.valueChanged.connect(self.update_display)
+        self.underline_spacing.valueChanged.connect(self.request_preview)
         ach_layout.addRow("Underline Spacing:", self.underline_spacing)
         
         self.ach_widget.setLayout(ach_layout)
@@ -118,8 +279,24 @@ class PdfCertificateGenerator(QMainWindow):
         self.autoresize_checkbox = QCheckBox("Auto-resize text to fit boxes")
         self.autoresize_checkbox.setChecked(True)
         self.autoresize_checkbox.setToolTip("If checked, font size will be reduced automatically to fit the text box during generation.")
+        self.autoresize_checkbox.toggled.connect(self.request_preview)
         controls_layout.addWidget(self.autoresize_checkbox)
         
+        profile_layout = QFormLayout()
+        self.save_profile_combo = QComboBox()
+        for profile in certengine.SAVE_PROFILES.values():
+            self.save_profile_combo.addItem(profile.name.capitalize(), profile.name)
+            self.save_profile_combo.setItemData(self.save_profile_combo.count() - 1, profile.description,
+                                                Qt.ItemDataRole.ToolTipRole)
+        self.save_profile_combo.setCurrentIndex(self.save_profile_combo.findData(certengine.DEFAULT_SAVE_PROFILE))
+        profile_layout.addRow("Save Profile:", self.save_profile_combo)
+        controls_layout.addLayout(profile_layout)
+
+        self.save_layout_button = QPushButton("Save Layout...")
+        self.save_layout_button.setToolTip("Save the current positions and sizes for use with 'python -m certengine'.")
+        self.save_layout_button.clicked.connect(self.save_layout)
+        controls_layout.addWidget(self.save_layout_button)
+
         controls_layout.addStretch()
 
         self.generate_button = QPushButton("Generate & Save All Certificates")
@@ -128,14 +305,31 @@ class PdfCertificateGenerator(QMainWindow):
         self.generate_button.clicked.connect(self.generate_all_certificates)
         controls_layout.addWidget(self.generate_button)
 
+        # --- Progress of a running batch (hidden while idle) ---
+        self.progress_bar = QProgressBar()
+        self.progress_status = QLabel("")
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.clicked.connect(self.toggle_pause_generation)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_generation)
+        batch_buttons = QHBoxLayout()
+        batch_buttons.addWidget(self.pause_button)
+        batch_buttons.addWidget(self.cancel_button)
+        controls_layout.addWidget(self.progress_bar)
+        controls_layout.addWidget(self.progress_status)
+        controls_layout.addLayout(batch_buttons)
+        self.set_generation_running(False)
+
         self.image_label = QLabel("Please select a Template PDF to begin")
         self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.image_label.setStyleSheet("background-color: #333333; color: white;")
+        # The preview is rendered to fit the label; its pixmap must not resize the label in turn.
+        self.image_label.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
         main_layout.addWidget(self.image_label, 1)
 
     def create_positioning_controls(self, add_wh_sliders=False):
         text_entry = QLineEdit()
-        text_entry.textChanged.connect(self.update_display)
+        text_entry.textChanged.connect(self.request_preview)
         x_slider, _ = self.create_slider(0, 1000)
         y_slider, _ = self.create_slider(0, 1000)
         size_slider, _ = self.create_slider(8, 150, 36)
@@ -167,7 +361,7 @@ class PdfCertificateGenerator(QMainWindow):
         slider = QSlider(Qt.Orientation.Horizontal)
         slider.setRange(min_val, max_val)
         slider.setValue(initial_val)
-        slider.valueChanged.connect(self.update_display)
+        slider.valueChanged.connect(self.request_preview)
         return slider, QLabel(f"Value: {initial_val}")
 
     def select_template_pdf(self):
@@ -177,6 +371,7 @@ class PdfCertificateGenerator(QMainWindow):
         self.template_path = path
         self.template_label.setText(os.path.basename(path))
         self.template_label.setToolTip(path)
+        self.first_preview_started = time.perf_counter()
         try:
             if self.doc_template: self.doc_template.close()
             self.doc_template = fitz.open(self.template_path)
@@ -186,22 +381,25 @@ class PdfCertificateGenerator(QMainWindow):
         if not self.doc_template.page_count:
             QMessageBox.critical(self, "Error", "This PDF has no pages."); return
 
+        self.template_id += 1
+
         page = self.doc_template[0]
         self.page_width = int(page.rect.width)
         self.page_height = int(page.rect.height)
 
-        for slider in [self.name_x, self.ach_x, self.ach_w]:
-            slider.setRange(0, self.page_width)
-        for slider in [self.name_y, self.ach_y, self.ach_h]:
-            slider.setRange(0, self.page_height)
-            
-        self.name_x.setValue(self.page_width // 2)
-        self.name_y.setValue(self.page_height // 3)
-        self.ach_x.setValue(int(self.page_width * 0.1))
-        self.ach_y.setValue(int(self.page_height * 0.6))
-        self.ach_w.setValue(int(self.page_width * 0.8))
-        self.ach_h.setValue(int(self.page_height * 0.2))
-        
+        with self.preview_updates_suppressed():
+            for slider in [self.name_x, self.ach_x, self.ach_w]:
+                slider.setRange(0, self.page_width)
+            for slider in [self.name_y, self.ach_y, self.ach_h]:
+                slider.setRange(0, self.page_height)
+
+            self.name_x.setValue(self.page_width // 2)
+            self.name_y.setValue(self.page_height // 3)
+            self.ach_x.setValue(int(self.page_width * 0.1))
+            self.ach_y.setValue(int(self.page_height * 0.6))
+            self.ach_w.setValue(int(self.page_width * 0.8))
+            self.ach_h.setValue(int(self.page_height * 0.2))
+        # Ask for the first preview right away instead of waiting for the timer.
         self.update_display()
 
     def select_csv_file(self):
@@ -222,26 +420,7 @@ class PdfCertificateGenerator(QMainWindow):
     def parse_csv(self):
         self.certificate_data = []
         try:
-            with open(self.csv_path, mode='r', encoding='utf-8-sig') as infile:
-                reader = csv.reader(infile)
-                for _ in range(3):
-                    try:
-                        next(reader)
-                    except StopIteration:
-                        break
-                
-                for row in reader:
-                    if not row or (len(row) < 2) or (not row[0].strip() and not row[1].strip()):
-                        continue
-                    
-                    name = row[0].strip()
-                    achievement = row[1].strip()
-
-                    if name:
-                        self.certificate_data.append([name, achievement])
-                    elif achievement and self.certificate_data:
-                        self.certificate_data[-1][1] += f"\n{achievement}"
-
+            self.certificate_data = certengine.parse_csv(self.csv_path)
         except Exception as e:
             QMessageBox.critical(self, "CSV Error", f"Failed to read or parse CSV file:\n{e}"); return
             
@@ -249,178 +428,190 @@ class PdfCertificateGenerator(QMainWindow):
             QMessageBox.warning(self, "CSV Warning", "No valid data found in CSV."); return
         
         first_name, first_ach = self.certificate_data[0]
-        self.name_text.setText(first_name)
-        self.ach_text.setText(first_ach)
-
-    def update_display(self, _=None):
-        if self.doc_template is None: return
-
-        temp_doc = fitz.open()
-        temp_page = temp_doc.new_page(width=self.page_width, height=self.page_height)
-        temp_page.show_pdf_page(temp_page.rect, self.doc_template, 0)
-        
-        temp_page.insert_font(fontname="F0", fontbuffer=self.font_name_bold.buffer)
-        temp_page.insert_font(fontname="F1", fontbuffer=self.font_achievement_reg.buffer)
-
-        rect_name = fitz.Rect(self.name_x.value(), self.name_y.value(), self.page_width, self.page_height)
-        self.insert_text_with_autoresize(temp_page, rect_name, self.name_text.text(), 
-                                         self.font_name_bold.buffer, "F0",
-                                         self.name_size.value(), self.name_rot.value(),
-                                         underline=False)
-
-        ach_x = self.ach_x.value()
-        ach_y = self.ach_y.value()
-        ach_w = self.ach_w.value()
-        ach_h = self.ach_h.value()
-        rect_ach = fitz.Rect(ach_x, ach_y, ach_x + ach_w, ach_y + ach_h)
-
-        temp_page.draw_rect(rect_ach, color=(1, 0, 0), width=1.5)
-        self.insert_text_with_autoresize(temp_page, rect_ach, self.ach_text.text(), 
-                                         self.font_achievement_reg.buffer, "F1",
-                                         self.ach_size.value(), self.ach_rot.value(),
-                                         underline=True, underline_spacing=self.underline_spacing.value())
-        
-        temp_pix = temp_page.get_pixmap(alpha=False)
-        temp_doc.close()
-
-        q_image = QImage(temp_pix.samples, temp_pix.width, temp_pix.height, temp_pix.stride, QImage.Format.Format_RGB888)
-        pixmap = QPixmap.fromImage(q_image)
-
-        scaled_pixmap = pixmap.scaled(self.image_label.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-        self.image_label.setPixmap(scaled_pixmap)
-
-    
-    def insert_text_with_autoresize(self, page, rect, text, font_buffer, font_alias, initial_fontsize, rotate, underline=False, underline_spacing=3, min_fontsize=8):
-        final_size = initial_fontsize
-        temp_font = fitz.Font(fontname=font_alias, fontbuffer=font_buffer)
-
-        if self.autoresize_checkbox.isChecked():
-            line_height_factor = temp_font.ascender - temp_font.descender
-            while final_size >= min_fontsize:
-                if '\n' not in text:
-                    text_width = temp_font.text_length(text, fontsize=final_size)
-                    if text_width <= rect.width:
-                        break
-                else:
-                    lines = text.split('\n')
-                    max_width = 0
-                    for line in lines:
-                        line_width = temp_font.text_length(line, fontsize=final_size)
-                        if line_width > max_width:
-                            max_width = line_width
-                    total_height = len(lines) * line_height_factor * final_size
-                    if max_width <= rect.width and total_height <= rect.height:
-                        break
-                final_size -= 1
-
-            if final_size < min_fontsize:
-                final_size = min_fontsize
-
-        # Calculate vertical offset based on how much the text was shrunk
-        # The more the text shrinks, the more we move it down
-        size_reduction_ratio = (initial_fontsize - final_size) / initial_fontsize
-        vertical_offset = size_reduction_ratio * (rect.height * 0.23)  # Adjust 0.2 factor as needed
-
-        # Create adjusted rectangle with vertical offset
-        adjusted_rect = fitz.Rect(
-            rect.x0, 
-            rect.y0 + vertical_offset, 
-            rect.x1, 
-            rect.y1 + vertical_offset
-        )
-
-        page.insert_textbox(
-            adjusted_rect, text,
-            fontname=font_alias,
-            fontsize=final_size,
-            color=(1, 1, 1),
-            align=fitz.TEXT_ALIGN_CENTER,
-            rotate=rotate
-        )
-
-        if underline and text.strip():
-            found_rects = page.search_for(text, clip=adjusted_rect, quads=False)
-            if found_rects:
-                actual_text_rect = found_rects[-1]
-                self.add_underline_to_text(page, actual_text_rect, text, temp_font, final_size, rotate, underline_spacing)
+        with self.preview_updates_suppressed():
+            self.name_text.setText(first_name)
+            self.ach_text.setText(first_ach)
 
-
-    def add_underline_to_text(self, page, text_actual_rect, text, font, fontsize, rotate, spacing):
-        """
-        Draws an underline using the ACTUAL rendered position of the text.
-        This version is compatible with older PyMuPDF versions that lack the 'Rect.center' property.
-        """
-        non_empty_lines = [line for line in text.split('\n') if line.strip()]
-        if not non_empty_lines:
+    def request_preview(self, _=None):
+        """Schedules a preview render; requests made before it runs are merged into it."""
+        if self.preview_suppressed or self.doc_template is None:
             return
-        last_line_width = font.text_length(non_empty_lines[-1], fontsize=fontsize)
+        if not self.preview_timer.isActive():
+            self.preview_timer.start()
 
-        underline_y = text_actual_rect.y1 + spacing
+    @contextlib.contextmanager
+    def preview_updates_suppressed(self):
+        """Ignores preview requests while controls are set in bulk, then asks for one render."""
+        self.preview_suppressed += 1
+        try:
+            yield
+        finally:
+            self.preview_suppressed -= 1
+        self.request_preview()
 
-        center_x = text_actual_rect.x0 + text_actual_rect.width / 2
-        p1_x = center_x - last_line_width / 2
-        p2_x = center_x + last_line_width / 2
+    def update_display(self, _=None):
+        """Hands the current state to the preview worker; the frame is shown when it is done."""
+        self.preview_timer.stop()
+        if self.doc_template is None: return
 
-        p1 = fitz.Point(p1_x, underline_y)
-        p2 = fitz.Point(p2_x, underline_y)
+        self.preview_sequence += 1
+        # MuPDF renders exactly the device pixels the label shows; Qt does not rescale.
+        self.preview_worker.submit(PreviewJob(
+            self.preview_sequence, self.template_id, self.template_path,
+            self.name_text.text(), self.ach_text.text(), self.current_layout(),
+            self.preview_zoom(), self.image_label.devicePixelRatioF()))
 
-        if rotate != 0:
-            pivot = fitz.Point(text_actual_rect.x0 + text_actual_rect.width / 2, 
-                               text_actual_rect.y0 + text_actual_rect.height / 2)
-            mat = fitz.Matrix(1, 1).prerotate(rotate)
-            p1 = (p1 - pivot) * mat + pivot
-            p2 = (p2 - pivot) * mat + pivot
+    def show_preview_frame(self, sequence, frame):
+        if sequence <= self.preview_shown_sequence:
+            return
+        self.preview_shown_sequence = sequence
+        self.preview_pixmap = QPixmap.fromImage(frame)
+        self.image_label.setPixmap(self.preview_pixmap)
+
+        if self.first_preview_started is not None:
+            elapsed_ms = (time.perf_counter() - self.first_preview_started) * 1000
+            self.first_preview_started = None
+            self.statusBar().showMessage(f"Template loaded; first preview in {elapsed_ms:.0f} ms", 5000)
+
+    def on_preview_failed(self, sequence, message):
+        if sequence > self.preview_shown_sequence:
+            self.statusBar().showMessage(f"Preview failed: {message}", 5000)
+
+    def preview_zoom(self):
+        """Scale from PDF points to device pixels that fits the whole page into image_label."""
+        ratio = self.image_label.devicePixelRatioF()
+        width = self.image_label.width() * ratio / self.page_width
+        height = self.image_label.height() * ratio / self.page_height
+        return max(min(width, height), 0.01)
+
+    def current_layout(self):
+        return certengine.Layout(
+            name_x=self.name_x.value(), name_y=self.name_y.value(),
+            name_size=self.name_size.value(), name_rot=self.name_rot.value(),
+            ach_x=self.ach_x.value(), ach_y=self.ach_y.value(),
+            ach_w=self.ach_w.value(), ach_h=self.ach_h.value(),
+            ach_size=self.ach_size.value(), ach_rot=self.ach_rot.value(),
+            underline_spacing=self.underline_spacing.value(),
+            autoresize=self.autoresize_checkbox.isChecked(),
+        )
 
-        page.draw_line(p1, p2, color=(1, 1, 1), width=max(0.7, fontsize * 0.05))
+    def save_layout(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Layout", "layout.json", "Layout Files (*.json)")
+        if not path: return
+        try:
+            self.current_layout().save(path)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not save layout: {e}")
 
     def generate_all_certificates(self):
+        if self.generation_thread is not None:
+            return
         if not all([self.template_path, self.csv_path, self.output_folder]):
             QMessageBox.warning(self, "Warning", "Please select a template, a CSV file, and an output folder."); return
         if not self.certificate_data:
             QMessageBox.warning(self, "Warning", "No data loaded from the CSV file."); return
 
-        name_rect = fitz.Rect(self.name_x.value(), self.name_y.value(), self.page_width, self.page_height)
-        name_size = self.name_size.value()
-        name_rot = self.name_rot.value()
-        
-        ach_x = self.ach_x.value()
-        ach_y = self.ach_y.value()
-        ach_w = self.ach_w.value()
-        ach_h = self.ach_h.value()
-        ach_rect = fitz.Rect(ach_x, ach_y, ach_x + ach_w, ach_y + ach_h)
-        ach_size = self.ach_size.value()
-        ach_rot = self.ach_rot.value()
-        
-        underline_spacing = self.underline_spacing.value()
-
-        count = 0
-        try:
-            for i, (name, achievement) in enumerate(self.certificate_data):
-                doc = fitz.open(self.template_path)
-                page = doc[0]
-
-                page.insert_font(fontname=f"F0-{i}", fontbuffer=self.font_name_bold.buffer)
-                page.insert_font(fontname=f"F1-{i}", fontbuffer=self.font_achievement_reg.buffer)
-
-                self.insert_text_with_autoresize(page, name_rect, name, self.font_name_bold.buffer, f"F0-{i}", name_size, name_rot, underline=False)
-                
-                self.insert_text_with_autoresize(page, ach_rect, achievement, self.font_achievement_reg.buffer, f"F1-{i}", ach_size, ach_rot, underline=True, underline_spacing=underline_spacing)
-
-                safe_name = re.sub(r'[\\/*?:"<>|]', "_", name)
-                output_path = os.path.join(self.output_folder, f"Certificate - {safe_name}.pdf")
-                doc.save(output_path, garbage=4, deflate=True)
-                doc.close()
-                count += 1
-            
-            QMessageBox.information(self, "Success", f"Successfully generated and saved {count} certificates to:\n{self.output_folder}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"An error occurred during PDF generation:\n{e}")
+        font_buffers = self.fonts.buffers()
+        self.generation_worker = GenerationWorker(self.template_path, self.certificate_data, self.current_layout(),
+                                                  self.output_folder, font_buffers,
+                                                  self.save_profile_combo.currentData())
+        self.generation_thread = QThread(self)
+        self.generation_worker.moveToThread(self.generation_thread)
+        self.generation_thread.started.connect(self.generation_worker.run)
+        self.generation_worker.progress.connect(self.on_generation_progress)
+        self.generation_worker.succeeded.connect(self.on_generation_succeeded)
+        self.generation_worker.failed.connect(self.on_generation_failed)
+        self.generation_worker.cancelled.connect(self.on_generation_cancelled)
+
+        self.generation_started = time.monotonic()
+        self.generation_paused_at = None
+        self.generation_paused_total = 0.0
+        self.progress_bar.setValue(0)
+        self.progress_status.setText("Starting...")
+        self.set_generation_running(True)
+        self.generation_thread.start()
+
+    def set_generation_running(self, running):
+        self.generate_button.setEnabled(not running)
+        self.pause_button.setText("Pause")
+        for widget in (self.progress_bar, self.progress_status, self.pause_button, self.cancel_button):
+            widget.setVisible(running)
+
+    def toggle_pause_generation(self):
+        control = self.generation_worker.control
+        if control.paused:
+            self.generation_paused_total += time.monotonic() - self.generation_paused_at
+            self.generation_paused_at = None
+            control.resume()
+            self.pause_button.setText("Pause")
+        else:
+            control.pause()
+            self.generation_paused_at = time.monotonic()
+            self.pause_button.setText("Resume")
+            self.progress_status.setText(self.progress_status.text() + " (paused)")
+
+    def cancel_generation(self):
+        if self.generation_worker is not None:
+            self.cancel_button.setEnabled(False)
+            self.progress_status.setText("Cancelling...")
+            self.generation_worker.control.cancel()
+
+    def on_generation_progress(self, done, total):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+        if self.generation_paused_at is not None:
+            return
+        elapsed = time.monotonic() - self.generation_started - self.generation_paused_total
+        if done and elapsed > 0:
+            rate = done / elapsed
+            eta = (total - done) / rate
+            self.progress_status.setText(f"{done} / {total} rows - {rate:.1f} rows/sec - ETA {int(eta) // 60}:{int(eta) % 60:02d}")
+        else:
+            self.progress_status.setText(f"{done} / {total} rows")
+
+    def finish_generation(self):
+        self.generation_thread.quit()
+        self.generation_thread.wait()
+        self.generation_thread.deleteLater()
+        self.generation_worker.deleteLater()
+        self.generation_thread = None
+        self.generation_worker = None
+        self.cancel_button.setEnabled(True)
+        self.set_generation_running(False)
+
+    def on_generation_succeeded(self, summary):
+        self.finish_generation()
+        QMessageBox.information(self, "Success", f"Successfully generated and saved {summary.rendered} certificates to:\n{self.output_folder}\n\n{summary}")
+
+    def on_generation_failed(self, message):
+        self.finish_generation()
+        QMessageBox.critical(self, "Error", f"An error occurred during PDF generation:\n{message}")
+
+    def on_generation_cancelled(self):
+        self.finish_generation()
+        QMessageBox.information(self, "Cancelled", "Generation was cancelled. Certificates already written are kept "
+                                                   "and will be skipped when you generate again.")
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        self.update_display()
+        if self.preview_pixmap is None:
+            return
+        # Stretch the last full-quality frame right away; render it at the new size once resizing stops.
+        ratio = self.image_label.devicePixelRatioF()
+        scaled = self.preview_pixmap.scaled(self.image_label.size() * ratio, Qt.AspectRatioMode.KeepAspectRatio,
+                                            Qt.TransformationMode.FastTransformation)
+        scaled.setDevicePixelRatio(ratio)
+        self.image_label.setPixmap(scaled)
+        self.resize_timer.start()
 
     def closeEvent(self, event):
+        if self.generation_worker is not None:
+            self.generation_worker.control.cancel()
+            self.generation_thread.quit()
+            self.generation_thread.wait()
+        self.preview_thread.quit()
+        self.preview_thread.wait()
+        self.preview_worker.close()
         if self.doc_template:
             self.doc_template.close()
         super().closeEvent(event)
@@ -4,6 +4,7 @@ import csv
 import re
 import math # Needed for rotation calculation
 import fitz  # PyMuPDF
+import certengine
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QFormLayout,
@@ -30,7 +31,7 @@ class PdfCertificateGenerator(QMainWindow):
         self.certificate_data = []
 
         # Create font objects
-        self.font_name_bold = fitz.Font("Helvetica-Bold")
+        self.font_name_bold = certengine.builtin_font("Helvetica-Bold").font
 
         # --- Load Achievement Font (Custom with Fallback) ---
         try:
@@ -41,14 +42,14 @@ class PdfCertificateGenerator(QMainWindow):
             font_path = os.path.join(script_dir, font_filename)
 
             # Try to load the custom font from the file
-            self.font_achievement_reg = fitz.Font(filename=font_path)
+            self.font_achievement_reg = certengine.font_from_file(font_path).font
             print(f"Successfully loaded custom font: {font_filename}")
 
         except Exception as e:
             # If loading fails, print a warning and fall back to the default Helvetica font
             print(f"WARNING: Could not load custom font '{font_filename}'. Falling back to Helvetica.")
             print(f"Error details: {e}")
-            self.font_achievement_reg = fitz.Font("Helvetica")
+            self.font_achievement_reg = certengine.builtin_font("Helvetica").font
 
 
         # --- Main Layout ---
@@ -259,12 +260,12 @@ class PdfCertificateGenerator(QMainWindow):
         temp_page = temp_doc.new_page(width=self.page_width, height=self.page_height)
         temp_page.show_pdf_page(temp_page.rect, self.doc_template, 0)
         
-        temp_page.insert_font(fontname="F0", fontbuffer=self.font_name_bold.buffer)
-        temp_page.insert_font(fontname="F1", fontbuffer=self.font_achievement_reg.buffer)
+        temp_page.insert_font(fontname="F0", fontbuffer=certengine.registered_font(self.font_name_bold).buffer)
+        temp_page.insert_font(fontname="F1", fontbuffer=certengine.registered_font(self.font_achievement_reg).buffer)
 
         rect_name = fitz.Rect(self.name_x.value(), self.name_y.value(), self.page_width, self.page_height)
         self.insert_text_with_autoresize(temp_page, rect_name, self.name_text.text(), 
-                                         self.font_name_bold.buffer, "F0",
+                                         certengine.registered_font(self.font_name_bold).buffer, "F0",
                                          self.name_size.value(), self.name_rot.value(),
                                          underline=False)
 
@@ -276,7 +277,7 @@ class PdfCertificateGenerator(QMainWindow):
 
         temp_page.draw_rect(rect_ach, color=(1, 0, 0), width=1.5)
         self.insert_text_with_autoresize(temp_page, rect_ach, self.ach_text.text(), 
-                                         self.font_achievement_reg.buffer, "F1",
+                                         certengine.registered_font(self.font_achievement_reg).buffer, "F1",
                                          self.ach_size.value(), self.ach_rot.value(),
                                          underline=True, underline_spacing=self.underline_spacing.value())
         
@@ -291,7 +292,7 @@ class PdfCertificateGenerator(QMainWindow):
 
     def insert_text_with_autoresize(self, page, rect, text, font_buffer, font_alias, initial_fontsize, rotate, underline=False, underline_spacing=3, min_fontsize=8):
         final_size = initial_fontsize
-        temp_font = fitz.Font(fontname=font_alias, fontbuffer=font_buffer)
+        temp_font = certengine.font_from_buffer(font_buffer).font
 
         if self.autoresize_checkbox.isChecked():
             line_height_factor = temp_font.ascender - temp_font.descender
@@ -384,12 +385,12 @@ class PdfCertificateGenerator(QMainWindow):
                 doc = fitz.open(self.template_path)
                 page = doc[0]
 
-                page.insert_font(fontname=f"F0-{i}", fontbuffer=self.font_name_bold.buffer)
-                page.insert_font(fontname=f"F1-{i}", fontbuffer=self.font_achievement_reg.buffer)
+                page.insert_font(fontname=f"F0-{i}", fontbuffer=certengine.registered_font(self.font_name_bold).buffer)
+                page.insert_font(fontname=f"F1-{i}", fontbuffer=certengine.registered_font(self.font_achievement_reg).buffer)
 
-                self.insert_text_with_autoresize(page, name_rect, name, self.font_name_bold.buffer, f"F0-{i}", name_size, name_rot, underline=False)
+                self.insert_text_with_autoresize(page, name_rect, name, certengine.registered_font(self.font_name_bold).buffer, f"F0-{i}", name_size, name_rot, underline=False)
                 
-                self.insert_text_with_autoresize(page, ach_rect, achievement, self.font_achievement_reg.buffer, f"F1-{i}", ach_size, ach_rot, underline=True, underline_spacing=underline_spacing)
+                self.insert_text_with_autoresize(page, ach_rect, achievement, certengine.registered_font(self.font_achievement_reg).buffer, f"F1-{i}", ach_size, ach_rot, underline=True, underline_spacing=underline_spacing)
 
                 safe_name = re.sub(r'[\\/*?:"<>|]', "_", name)
                 output_path = os.path.join(self.output_folder, f"Certificate - {safe_name}.pdf")
@@ -0,0 +1,73 @@
+"""
+The "direct" render backend against the default one: both must draw the same pages.
+"""
+import os
+
+import pymupdf as fitz  # PyMuPDF
+import pytest
+
+from certengine import (RENDER_BACKENDS, CertificateFonts, Layout, Template, load_fonts, plan_certificate,
+                        render_certificate)
+from certengine.engine import MIN_FONTSIZE
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_PATH = os.path.join(ROOT, "SixD Certificate Final F.pdf.pdf")
+DPI = 100
+
+ROWS = [
+    ("Jane Doe", "Outstanding Contribution"),
+    ("Dr. Alexandra Montgomery-Fitzgerald", "Employee of the Month\nMarch 2025"),
+    ("Li Wei", "Excellence in Customer Service, Quality Assurance, Process Improvement, Mentoring, "
+               "Cross-Team Collaboration, Continuous Delivery Across Every Product Line, Community "
+               "Outreach, Sustainability Initiatives and Outstanding Leadership Throughout the Year"),
+    ("Sam", ""),
+]
+
+
+@pytest.fixture(scope="module")
+def template():
+    template = Template.open(TEMPLATE_PATH)
+    yield template
+    template.close()
+
+
+@pytest.fixture(scope="module")
+def fonts():
+    return CertificateFonts.coerce(load_fonts())
+
+
+def page_pixels(doc):
+    pdf = fitz.open("pdf", doc.tobytes())
+    samples = pdf[0].get_pixmap(dpi=DPI).samples
+    pdf.close()
+    doc.close()
+    return samples
+
+
+def layout_for(rotate):
+    return Layout(name_x=300, name_y=250, name_size=36, name_rot=rotate,
+                  ach_x=100, ach_y=330, ach_w=640, ach_h=110, ach_size=40, ach_rot=rotate,
+                  underline_spacing=2, autoresize=True)
+
+
+@pytest.mark.parametrize("rotate", [0, 90, 180, 270])
+@pytest.mark.parametrize("name, achievement", ROWS)
+def test_backends_draw_the_same_page(template, fonts, rotate, name, achievement):
+    layout = layout_for(rotate)
+    plan = plan_certificate(name, achievement, layout, fonts, template.page_width, template.page_height)
+    pages = [page_pixels(render_certificate(template, name, achievement, layout, fonts, plan, backend))
+             for backend in RENDER_BACKENDS]
+    assert all(page == pages[0] for page in pages[1:])
+
+
+def test_rows_cover_multi_line_and_clamped_text(template, fonts):
+    plans = [plan_certificate(name, achievement, layout_for(0), fonts, template.page_width, template.page_height)
+             for name, achievement in ROWS]
+    assert len(plans[1].ach_lines) == 2
+    assert plans[2].ach_size == MIN_FONTSIZE and len(plans[2].ach_lines) > 1
+
+
+def test_direct_backend_rejects_other_rotations(template, fonts):
+    layout = layout_for(15)
+    with pytest.raises(ValueError, match="multiple of 90"):
+        render_certificate(template, *ROWS[0], layout, fonts, backend="direct")
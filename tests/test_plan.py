@@ -0,0 +1,48 @@
+"""
+plan_certificates must give exactly the plans plan_certificate gives row by row.
+"""
+import random
+
+import pytest
+
+from certengine import CertificateFonts, Layout, load_fonts, plan_certificate, plan_certificates
+
+WORDS = ("Outstanding Sales Achievement Champion of the Year Best Team Player Excellence in "
+         "Customer Service Leadership Award").split()
+
+
+@pytest.fixture(scope="module")
+def fonts():
+    return CertificateFonts.coerce(load_fonts())
+
+
+def random_rows(rng, count):
+    rows = []
+    for i in range(count):
+        achievement = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12)))
+        if rng.random() < 0.2:
+            achievement = achievement.replace(" ", "\n", 1)
+        rows.append((f"Person {i}", achievement))
+    return rows + [("Blank", ""), ("Spaces", " \n "), ("Trailing", "Best Team\n\n")]
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_column_plans_match_row_plans(fonts, seed):
+    rng = random.Random(seed)
+    layout = Layout(name_x=rng.randint(0, 400), name_y=rng.randint(0, 400), name_size=rng.randint(20, 60),
+                    name_rot=rng.choice([0, 90, 180, 270]), ach_x=rng.uniform(0, 300), ach_y=rng.uniform(0, 300),
+                    ach_w=rng.uniform(50, 500), ach_h=rng.uniform(30, 300), ach_size=rng.randint(20, 70),
+                    ach_rot=rng.choice([0, 90, 180, 270]), underline_spacing=rng.randint(0, 5),
+                    autoresize=rng.random() < 0.8)
+    rows = random_rows(rng, 150)
+    column = plan_certificates(rows, layout, fonts, 842, 595)
+    single = [plan_certificate(name, achievement, layout, fonts, 842, 595) for name, achievement in rows]
+    assert [plan.to_dict() for plan in column] == [plan.to_dict() for plan in single]
+
+
+def test_sideways_box_with_inexact_shift(fonts):
+    layout = Layout(ach_x=100, ach_y=330, ach_w=320, ach_h=193, ach_size=60, ach_rot=270, underline_spacing=2)
+    rows = [("Jane Doe", "Outstanding Sales Achievement Champion of"), ("Li Wei", "Best Team Player")]
+    column = plan_certificates(rows, layout, fonts, 842, 595)
+    single = [plan_certificate(name, achievement, layout, fonts, 842, 595) for name, achievement in rows]
+    assert [plan.underline for plan in column] == [plan.underline for plan in single]
@@ -0,0 +1,113 @@
+"""
+underline_segment against the geometry it replaced: the text drawn with
+page.insert_textbox and the underline placed below the last rect page.search_for finds.
+"""
+import os
+
+import pymupdf as fitz  # PyMuPDF
+import pytest
+
+from certengine import break_lines, text_max_width, underline_segment
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FONT_ALIAS = "F1"
+FONT_SIZE = 24
+SPACING = 3
+
+
+@pytest.fixture(scope="module")
+def font_buffer():
+    with open(os.path.join(ROOT, "Brixton_Medium.ttf"), "rb") as infile:
+        return infile.read()
+
+
+@pytest.fixture(scope="module")
+def font(font_buffer):
+    return fitz.Font(fontbuffer=font_buffer)
+
+
+def search_for_underline(font_buffer, font, rect, text, fontsize, rotate, spacing):
+    """The underline as the engine drew it before underline_segment, and the rect search_for found."""
+    doc = fitz.open()
+    page = doc.new_page(width=842, height=595)
+    page.insert_font(fontname=FONT_ALIAS, fontbuffer=font_buffer)
+    page.insert_textbox(rect, text, fontname=FONT_ALIAS, fontsize=fontsize,
+                        align=fitz.TEXT_ALIGN_CENTER, rotate=rotate)
+    found = page.search_for(text, clip=rect, quads=False)[-1]
+    doc.close()
+
+    last_line = [line for line in text.split("\n") if line.strip()][-1]
+    last_line_width = font.text_length(last_line, fontsize=fontsize)
+    center_x = found.x0 + found.width / 2
+    p1 = fitz.Point(center_x - last_line_width / 2, found.y1 + spacing)
+    p2 = fitz.Point(center_x + last_line_width / 2, found.y1 + spacing)
+    if rotate != 0:
+        pivot = fitz.Point(center_x, found.y0 + found.height / 2)
+        mat = fitz.Matrix(1, 1).prerotate(rotate)
+        p1 = (p1 - pivot) * mat + pivot
+        p2 = (p2 - pivot) * mat + pivot
+    return (p1, p2), found
+
+
+def metric_underline(font, rect, text, fontsize, rotate, spacing):
+    lines = break_lines(font, text, fontsize, text_max_width(rect, rotate))
+    return underline_segment(rect, lines, font, fontsize, rotate, spacing)
+
+
+def assert_same_underline(actual, expected):
+    actual = sorted(actual, key=lambda point: (point.x, point.y))
+    expected = sorted(expected, key=lambda point: (point.x, point.y))
+    for point, old_point in zip(actual, expected):
+        assert point.y == pytest.approx(old_point.y, abs=1e-3)
+        assert abs(point.x - old_point.x) <= 0.1
+
+
+@pytest.mark.parametrize("text", [
+    "Outstanding Contribution",
+    "Best Team Player",
+    "Excellence in Customer Service",
+])
+def test_single_line_matches_search_for(font_buffer, font, text):
+    rect = fitz.Rect(200, 300, 650, 400)
+    expected, _ = search_for_underline(font_buffer, font, rect, text, FONT_SIZE, 0, SPACING)
+    assert_same_underline(metric_underline(font, rect, text, FONT_SIZE, 0, SPACING), expected)
+
+
+@pytest.mark.parametrize("text", [
+    "Outstanding\nContribution",
+    "Employee of the Month\nMarch",
+    "A\nB\nLeadership",
+])
+def test_explicit_multi_line_matches_search_for(font_buffer, font, text):
+    rect = fitz.Rect(200, 250, 650, 450)
+    expected, _ = search_for_underline(font_buffer, font, rect, text, FONT_SIZE, 0, SPACING)
+    assert_same_underline(metric_underline(font, rect, text, FONT_SIZE, 0, SPACING), expected)
+
+
+@pytest.mark.parametrize("text", ["Outstanding Contribution", "Employee of the Month\nMarch"])
+def test_upside_down_box_matches_search_for(font_buffer, font, text):
+    rect = fitz.Rect(200, 250, 650, 450)
+    expected, _ = search_for_underline(font_buffer, font, rect, text, FONT_SIZE, 180, SPACING)
+    assert_same_underline(metric_underline(font, rect, text, FONT_SIZE, 180, SPACING), expected)
+
+
+@pytest.mark.parametrize("rotate", [90, 270])
+def test_sideways_box_underlines_below_the_text(font_buffer, font, rotate):
+    # The old rotation about the found rect put these underlines across the text or on
+    # its far side; the underline belongs spacing points past the glyphs' bottom edge.
+    rect = fitz.Rect(300, 100, 420, 500)
+    text = "Outstanding Contribution"
+    _, found = search_for_underline(font_buffer, font, rect, text, FONT_SIZE, rotate, SPACING)
+    start, end = metric_underline(font, rect, text, FONT_SIZE, rotate, SPACING)
+
+    assert start.x == pytest.approx(end.x)
+    expected_x = found.x1 + SPACING if rotate == 90 else found.x0 - SPACING
+    assert start.x == pytest.approx(expected_x, abs=1e-3)
+    top, bottom = sorted((start.y, end.y))
+    assert abs(top - found.y0) <= 0.1
+    assert abs(bottom - found.y1) <= 0.1
+
+
+def test_no_underline_without_text(font):
+    rect = fitz.Rect(200, 300, 650, 400)
+    assert underline_segment(rect, ["", " "], font, FONT_SIZE, 0, SPACING) is None